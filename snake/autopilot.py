@@ -0,0 +1,220 @@
+"""
+Autopilot player which follows shortest paths to the food.
+
+The autopilot keeps a BFS distance field from the food over the cells not
+covered by the snake. The field is only rebuilt when the food moves or
+the autopilot missed a tick; during a normal tick just two cells change
+(the freed tail and the new head), and the field is repaired locally
+around them.
+
+On large boards a rebuild takes longer than a tick, so with a budget the
+BFS runs over a copy of the grid for at most budget cells per call. The
+moves made meanwhile are replayed on the copy when it is done, and until
+then the autopilot heads straight for the food.
+"""
+
+import heapq
+from collections import deque
+
+from engine import MOVES
+
+INF = 1 << 30
+
+class Autopilot(object):
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.ncells = None
+        self.adjacent = None
+        self.dist = None
+        self.grid = None
+        self.food = None
+        self.head = None
+        self.tail = None
+        self.ticks = None
+        # BFS queue while a rebuild is in progress
+        self.queue = None
+        # (head, tail) cells of the ticks played during the rebuild
+        self.pending = []
+
+    def neighbours(self, n, i):
+        r, c = divmod(i, n)
+        cells = []
+        if c > 0: cells.append(i - 1)
+        if c < n - 1: cells.append(i + 1)
+        if r > 0: cells.append(i - n)
+        if r < n - 1: cells.append(i + n)
+        return tuple(cells)
+
+    def prepare(self, n):
+        """Build the neighbour lists for an n x n board ahead of the first tick."""
+        if n != self.ncells:
+            self.ncells = n
+            self.adjacent = [self.neighbours(n, i) for i in range(n * n)]
+
+    def start_rebuild(self, engine):
+        n = engine.ncells
+        self.prepare(n)
+        self.dist = [INF] * (n * n)
+        self.grid = bytearray(engine.grid)
+        c, r = engine.food
+        source = engine.index(c, r)
+        self.dist[source] = 0
+        self.queue = deque([source])
+        del self.pending[:]
+
+    def extend(self, limit=None):
+        """Run the rebuild for up to limit cells, returns True once it is done."""
+        queue = self.queue
+        dist = self.dist
+        adjacent = self.adjacent
+        grid = self.grid
+        popleft = queue.popleft
+        append = queue.append
+        if limit is None:
+            limit = len(dist)
+        while queue and limit > 0:
+            limit -= 1
+            i = popleft()
+            d = dist[i] + 1
+            for j in adjacent[i]:
+                if d < dist[j] and not grid[j]:
+                    dist[j] = d
+                    append(j)
+        return not queue
+
+    def finish_rebuild(self, engine):
+        grid = self.grid
+        for head, tail in self.pending:
+            grid[tail] = 0
+            grid[head] = 1
+            self.block(grid, head)
+            self.unblock(grid, tail)
+        del self.pending[:]
+        self.queue = None
+        self.grid = engine.grid
+
+    def rebuild(self, engine):
+        self.start_rebuild(engine)
+        self.extend()
+        self.finish_rebuild(engine)
+
+    def unblock(self, grid, i):
+        """A cell was freed, distances can only shrink around it."""
+        dist = self.dist
+        adjacent = self.adjacent
+        # the head may have moved straight into the old tail cell
+        if grid[i]:
+            return
+        dist[i] = min([dist[j] for j in adjacent[i]] + [INF - 1]) + 1
+        if dist[i] >= INF:
+            dist[i] = INF
+            return
+        queue = deque([i])
+        while queue:
+            k = queue.popleft()
+            d = dist[k] + 1
+            for j in adjacent[k]:
+                if d < dist[j] and not grid[j]:
+                    dist[j] = d
+                    queue.append(j)
+
+    def block(self, grid, i):
+        """
+        A cell was covered. Cells whose every shortest path ran through it
+        lose their distance and are repaired from their unaffected
+        neighbours.
+        """
+        dist = self.dist
+        adjacent = self.adjacent
+        if dist[i] >= INF:
+            return
+        old = {i: dist[i]}
+        dist[i] = INF
+        affected = set([i])
+        queue = deque([i])
+        while queue:
+            k = queue.popleft()
+            for j in adjacent[k]:
+                d = dist[j]
+                # only cells one step further from the food can depend on k
+                if j in affected or grid[j] or d != old.get(k, dist[k]) + 1:
+                    continue
+                # j keeps its distance if some other neighbour still leads on
+                supported = False
+                for p in adjacent[j]:
+                    if dist[p] == d - 1 and p not in affected and not grid[p]:
+                        supported = True
+                        break
+                if not supported:
+                    affected.add(j)
+                    queue.append(j)
+        affected.discard(i)
+        for j in affected:
+            dist[j] = INF
+        heap = []
+        for j in affected:
+            d = min(dist[p] for p in adjacent[j]) + 1
+            if d < INF:
+                dist[j] = d
+                heap.append((d, j))
+        heapq.heapify(heap)
+        while heap:
+            d, k = heapq.heappop(heap)
+            if d > dist[k]:
+                continue
+            for j in adjacent[k]:
+                if d + 1 < dist[j] and not grid[j]:
+                    dist[j] = d + 1
+                    heapq.heappush(heap, (d + 1, j))
+
+    def sync(self, engine):
+        head = engine.snake[0]
+        tail = engine.snake[-1]
+        if (self.dist is not None and engine.ticks == self.ticks and engine.food == self.food
+                and engine.ncells == self.ncells):
+            # called again within the same tick
+            pass
+        elif (self.dist is None or engine.food != self.food or engine.ncells != self.ncells
+                or engine.ticks != self.ticks + 1):
+            # the repair only covers one tick, after a skipped tick the
+            # cells passed in between would be missed
+            self.start_rebuild(engine)
+        elif self.queue is not None:
+            self.pending.append((engine.index(*head), engine.index(*self.tail)))
+        else:
+            # the head is blocked first so the freed tail is not repaired
+            # from the stale distance of the new head cell
+            grid = engine.grid
+            if head != self.head:
+                self.block(grid, engine.index(*head))
+            if tail != self.tail:
+                self.unblock(grid, engine.index(*self.tail))
+        if self.queue is not None and self.extend(self.budget):
+            self.finish_rebuild(engine)
+        self.food = engine.food
+        self.head = head
+        self.tail = tail
+        self.ticks = engine.ticks
+
+    def __call__(self, engine):
+        if engine.food is None:
+            return 0
+        self.sync(engine)
+        moves = engine.safe_moves()
+        if not moves:
+            return 0
+        c, r = engine.snake[0]
+        if self.queue is not None:
+            fc, fr = engine.food
+            def cost(d):
+                dc, dr = MOVES[d]
+                return (abs(c + dc - fc) + abs(r + dr - fr), d != engine.direction)
+            return min(moves, key=cost)
+        n = self.ncells
+        dist = self.dist
+        def cost(d):
+            dc, dr = MOVES[d]
+            # prefer going straight when nothing leads to the food
+            return (dist[(r + dr - 1) * n + (c + dc - 1)], d != engine.direction)
+        return min(moves, key=cost)
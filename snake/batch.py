@@ -0,0 +1,155 @@
+from __future__ import division
+
+import numpy as np
+
+from engine import SnakeEngine, UP, MOVES
+
+class BatchEngine(object):
+    """
+    Steps many independent Snake games at once with the rules of
+    SnakeEngine. The state of every board lives in NumPy arrays indexed by
+    board number:
+
+        head       (B, 2) head column and row, 1-based like SnakeEngine
+        body       (B, ncells**2) ring buffer of flat cell indices
+        head_ptr   (B,) slot of the head in body
+        length     (B,) number of body segments
+        grid       (B, ncells**2) occupancy, see the board property
+        food       (B,) flat cell index of the food, -1 if none
+
+    Flat cell indices are (row - 1) * ncells + (column - 1).
+    """
+
+    def __init__(self, nboards, ncells, speed_factor=.99, seed=None):
+        self.nboards = nboards
+        self.ncells = ncells
+        self.ncap = ncells * ncells
+        self.speed_factor = speed_factor
+        self.rng = np.random.RandomState(seed)
+
+        self.moves = np.zeros((5, 2), dtype=np.int32)
+        for d, mod in MOVES.items():
+            self.moves[d] = mod
+
+        itype = np.int16 if self.ncap < 2 ** 15 else np.int32
+        self.direction = np.zeros(nboards, dtype=np.int8)
+        self.head = np.zeros((nboards, 2), dtype=np.int32)
+        self.body = np.zeros((nboards, self.ncap), dtype=itype)
+        self.head_ptr = np.zeros(nboards, dtype=np.int32)
+        self.length = np.zeros(nboards, dtype=np.int32)
+        self.grid = np.zeros((nboards, self.ncap), dtype=np.uint8)
+        self.food = np.zeros(nboards, dtype=np.int32)
+        self.speed = np.zeros(nboards, dtype=np.float64)
+        self.score = np.zeros(nboards, dtype=np.int64)
+        self.food_eaten = np.zeros(nboards, dtype=np.int32)
+        self.ticks = np.zeros(nboards, dtype=np.int64)
+        self.alive = np.zeros(nboards, dtype=bool)
+        self.result = np.zeros(nboards, dtype=np.int8)
+
+    @property
+    def board(self):
+        """Occupancy as a (B, row, column) view of grid."""
+        return self.grid.reshape(self.nboards, self.ncells, self.ncells)
+
+    def reset(self, mask=None):
+        """Start new games on all boards, or on the boards selected by mask."""
+        if mask is None:
+            idx = np.arange(self.nboards)
+        else:
+            idx = np.flatnonzero(mask)
+        if len(idx) == 0:
+            return
+
+        center = int(self.ncells / 2) + 1
+        self.direction[idx] = UP
+        self.head[idx] = (center, center)
+        self.grid[idx] = 0
+        self.body[idx] = 0
+        for k, r in enumerate(range(2, -1, -1)):
+            i = (center - r - 1) * self.ncells + (center - 1)
+            self.body[idx, k] = i
+            self.grid[idx, i] = 1
+        self.head_ptr[idx] = 2
+        self.length[idx] = 3
+        self.speed[idx] = .1
+        self.score[idx] = 0
+        self.food_eaten[idx] = 0
+        self.ticks[idx] = 0
+        self.alive[idx] = True
+        self.result[idx] = SnakeEngine.MOVED
+        self.spawn_food(idx)
+
+    def spawn_food(self, idx):
+        """Place food on a uniformly random empty cell of each board in idx."""
+        free = self.grid[idx] == 0
+        count = free.sum(axis=1)
+        k = np.floor(self.rng.random_sample(len(idx)) * count).astype(np.int64)
+        pick = (np.cumsum(free, axis=1) > k[:, None]).argmax(axis=1)
+        self.food[idx] = np.where(count > 0, pick, -1)
+        return count > 0
+
+    def turn(self, actions):
+        """Apply quarter turns; 0 or a reversal keeps the current direction."""
+        actions = np.asarray(actions, dtype=np.int8)
+        ok = (actions > 0) & ((self.direction + actions) % 2 == 1) & self.alive
+        self.direction[ok] = actions[ok]
+
+    def step(self, actions=None):
+        """
+        Advance every live board by one tick. Returns the result of the tick
+        per board using the SnakeEngine result codes; finished boards keep
+        their last result.
+        """
+        if actions is not None:
+            self.turn(actions)
+
+        idx = np.flatnonzero(self.alive)
+        n = self.ncells
+        self.ticks[idx] += 1
+
+        head = self.head[idx] + self.moves[self.direction[idx]]
+        nc = head[:, 0]
+        nr = head[:, 1]
+
+        # First check if new head location is out of bounds
+        wall = (nc < 1) | (nc > n) | (nr < 1) | (nr > n)
+        self.alive[idx[wall]] = False
+        self.result[idx[wall]] = SnakeEngine.HIT_WALL
+        keep = ~wall
+        idx = idx[keep]
+        head = head[keep]
+        ni = (head[:, 1] - 1) * n + (head[:, 0] - 1)
+
+        # Boards where the next cell is food grow onto it
+        ate = ni == self.food[idx]
+        eat_idx = idx[ate]
+        self.food_eaten[eat_idx] += 1
+        self.score[eat_idx] += np.ceil((self.food_eaten[eat_idx] - 1) * 1.5 + 10).astype(np.int64)
+        self.speed[eat_idx] *= self.speed_factor
+        self.length[eat_idx] += 1
+        self.result[eat_idx] = SnakeEngine.ATE
+
+        # The others retract their tail before the head advances
+        move_idx = idx[~ate]
+        move_ni = ni[~ate]
+        tail = (self.head_ptr[move_idx] - self.length[move_idx] + 1) % self.ncap
+        self.grid[move_idx, self.body[move_idx, tail]] = 0
+        hit = self.grid[move_idx, move_ni] == 1
+        self.alive[move_idx[hit]] = False
+        self.result[move_idx[hit]] = SnakeEngine.HIT_SELF
+        self.result[move_idx[~hit]] = SnakeEngine.MOVED
+
+        grow = np.concatenate((eat_idx, move_idx[~hit]))
+        grow_ni = np.concatenate((ni[ate], move_ni[~hit]))
+        grow_head = np.concatenate((head[ate], head[~ate][~hit]))
+        self.head_ptr[grow] = (self.head_ptr[grow] + 1) % self.ncap
+        self.body[grow, self.head_ptr[grow]] = grow_ni
+        self.grid[grow, grow_ni] = 1
+        self.head[grow] = grow_head
+
+        if len(eat_idx):
+            placed = self.spawn_food(eat_idx)
+            self.alive[eat_idx[~placed]] = False
+            self.result[eat_idx[~placed]] = SnakeEngine.BOARD_FULL
+
+        return self.result
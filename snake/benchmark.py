@@ -0,0 +1,223 @@
+"""
+Benchmarks for the tick path as a function of board size and snake length.
+
+    python -m snake.benchmark --save data/bench_baseline.json
+    python -m snake.benchmark --compare data/bench_baseline.json
+
+Each case times single calls of move_snake_body (the engine step), spawn_food,
+duplicates, reset and clear and reports percentiles in microseconds. The
+headless cases use SnakeEngine alone; with --render the same cases also
+update a BoardRenderer in a hidden window the way Task does. Results can be
+saved as a JSON baseline and later runs compared against it; --compare
+exits with 1 if a percentile got slower than the tolerance allows.
+"""
+
+import sys
+import json
+import argparse
+from array import array
+from timeit import default_timer
+
+from engine import SnakeEngine, duplicates, RIGHT, LEFT, UP
+from state import SnakeState
+
+BOARD_SIZES = [11, 21, 31, 49, 71, 101, 201, 301, 501]
+FILLS = [0., .1, .5, .9]
+PERCENTILES = [50, 90, 95, 99]
+
+def serpentine(n):
+    """Cells of a boustrophedon path covering the board from (1, 1)."""
+    path = []
+    for r in range(1, n + 1):
+        cols = range(1, n + 1) if r % 2 else range(n, 0, -1)
+        for c in cols:
+            path.append(((c, r), RIGHT if r % 2 else LEFT))
+    return path
+
+def make_state(n, length, seed=0):
+    """
+    A game on an n x n board with a snake of the given length laid along
+    the serpentine path, heading on along it, with food at the end of it.
+    """
+    engine = SnakeEngine(n)
+    engine.reset(seed)
+    path = serpentine(n)
+    length = max(3, min(length, len(path) - 2))
+    for c, r in engine.snake:
+        engine.grid[engine.index(c, r)] = 0
+    engine.snake.clear()
+    for k in range(length):
+        (c, r), _ = path[k]
+        engine.snake.appendleft((c, r))
+        engine.grid[engine.index(c, r)] = 1
+    (c, r), d = path[length - 1]
+    # at the end of a row the path goes up
+    engine.direction = UP if path[length][0][1] != r else d
+    engine.food, _ = path[-1]
+    engine.free = array('i', [i for i in range(n * n) if not engine.grid[i]])
+    for k, i in enumerate(engine.free):
+        engine.free_pos[i] = k
+    return SnakeState.from_engine(engine), engine
+
+def percentiles(samples):
+    samples = sorted(samples)
+    result = {}
+    for p in PERCENTILES:
+        result['p%d' % p] = samples[min(len(samples) - 1, int(len(samples) * p / 100.))] * 1e6
+    result['max'] = samples[-1] * 1e6
+    result['mean'] = sum(samples) / len(samples) * 1e6
+    return result
+
+class Bench(object):
+
+    def __init__(self, n, length, repeat, renderer=None):
+        self.n = n
+        self.repeat = repeat
+        self.state, self.engine = make_state(n, length)
+        self.length = self.state.length
+        self.board = renderer
+
+    def restore(self):
+        self.state.restore(self.engine)
+        if self.board:
+            self.board.clear()
+            for c, r in self.engine.snake:
+                self.board.set_cell(c, r, (255, 255, 255, 255))
+
+    def move_snake_body(self):
+        engine = self.engine
+        board = self.board
+        samples = []
+        self.restore()
+        while len(samples) < self.repeat:
+            if engine.game_over or engine.ticks - self.state.ticks > 100:
+                self.restore()
+            t = default_timer()
+            tail = engine.snake[-1]
+            result = engine.step()
+            if board and not engine.game_over:
+                if result == SnakeEngine.ATE:
+                    board.set_cell(engine.food[0], engine.food[1], (255, 0, 0, 255))
+                else:
+                    board.set_cell(tail[0], tail[1], (0, 0, 0, 0))
+                c, r = engine.snake[0]
+                board.set_cell(c, r, (255, 255, 255, 255))
+            samples.append(default_timer() - t)
+        return samples
+
+    def spawn_food(self):
+        engine = self.engine
+        board = self.board
+        samples = []
+        self.restore()
+        for _ in range(self.repeat):
+            t = default_timer()
+            engine.spawn_food()
+            if board:
+                board.set_cell(engine.food[0], engine.food[1], (255, 0, 0, 255))
+            samples.append(default_timer() - t)
+        return samples
+
+    def duplicates(self):
+        self.restore()
+        cells = list(self.engine.snake)
+        samples = []
+        for _ in range(self.repeat):
+            t = default_timer()
+            duplicates(cells)
+            samples.append(default_timer() - t)
+        return samples
+
+    def reset(self):
+        engine = self.engine
+        board = self.board
+        samples = []
+        for k in range(self.repeat):
+            self.restore()
+            t = default_timer()
+            engine.reset(k)
+            if board:
+                board.clear()
+                for c, r in engine.snake:
+                    board.set_cell(c, r, (255, 255, 255, 255))
+                board.set_cell(engine.food[0], engine.food[1], (255, 0, 0, 255))
+            samples.append(default_timer() - t)
+        return samples
+
+    def clear(self):
+        samples = []
+        for _ in range(self.repeat):
+            self.restore()
+            t = default_timer()
+            self.board.clear()
+            samples.append(default_timer() - t)
+        return samples
+
+def run(board_sizes, fills, repeat, render=False, max_duplicates=500, out=sys.stdout):
+    setups = [('headless', None)]
+    if render:
+        import pyglet
+        from board import BoardRenderer
+        window = pyglet.window.Window(visible=False)
+        setups.append(('render', lambda n: BoardRenderer(n, 10)))
+
+    results = {}
+    for setup, make_renderer in setups:
+        for n in board_sizes:
+            renderer = make_renderer(n) if make_renderer else None
+            for fill in fills:
+                bench = Bench(n, int(fill * n * n), repeat, renderer)
+                cases = ['move_snake_body', 'spawn_food', 'reset']
+                if renderer:
+                    cases.append('clear')
+                # duplicates is quadratic in the snake length
+                elif bench.length <= max_duplicates:
+                    cases.append('duplicates')
+                for case in cases:
+                    key = '%s/%s/n=%d/len=%d' % (setup, case, n, bench.length)
+                    results[key] = stats = percentiles(getattr(bench, case)())
+                    out.write('%-48s %s\n' % (key, ' '.join('%s=%.1f' % (p, stats[p])
+                                                            for p in ['p50', 'p95', 'p99', 'max'])))
+            if renderer:
+                renderer.delete()
+    if render:
+        window.close()
+    return results
+
+def compare(results, baseline, tolerance, out=sys.stdout):
+    """Report the cases whose p50 or p95 grew beyond tolerance times the baseline."""
+    regressions = []
+    for key, stats in sorted(results.items()):
+        if key not in baseline:
+            continue
+        for p in ('p50', 'p95'):
+            if stats[p] > baseline[key][p] * tolerance:
+                regressions.append(key)
+                out.write('REGRESSION %s %s %.1fus -> %.1fus\n' % (key, p, baseline[key][p], stats[p]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Snake tick path.')
+    parser.add_argument('--board-sizes', type=int, nargs='+', default=BOARD_SIZES)
+    parser.add_argument('--fills', type=float, nargs='+', default=FILLS,
+                        help='snake length as a fraction of the board')
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--render', action='store_true', help='also time renderer updates')
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', help='compare against a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = run(args.board_sizes, args.fills, args.repeat, args.render)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+from __future__ import division
+
+import ctypes
+from array import array
+
+import pyglet
+from pyglet.gl import *
+
+from cocos.cocosnode import CocosNode
+
+def grid2coord(c, r, cell, pad=1, gap=1):
+        x = (c - .5) * cell + c * gap + pad
+        y = (r - .5) * cell + r * gap + pad
+        return((x,y))
+
+def cell_size(extent, ncells):
+    """
+    Size of a cell and of the gap between cells that fit ncells cells into
+    extent pixels. Boards that fit use whole cells in steps of 10 pixels
+    with 1 pixel gaps; larger boards get fractional cells, and once the
+    cells get smaller than 2 pixels the gaps are dropped.
+    """
+    cell = int(extent / ncells * .1) * 10
+    if cell > 0:
+        return cell, 1
+    cell = (extent - ncells - 1) / float(ncells)
+    if cell >= 2:
+        return cell, 1
+    return extent / float(ncells), 0
+
+def board_width(ncells, cell, gap):
+    return ncells * cell + (ncells + 1) * gap
+
+class BoardRenderer(CocosNode):
+    """
+    Draws every cell of the board from one pre-allocated vertex list with
+    one quad per cell. Positions are computed once, afterwards only the
+    colors of the cells that change are written, and the whole board is a
+    single draw call. Cell sizes may be fractional, which lets boards of
+    a few hundred cells a side fit on screen.
+
+    Colors are written straight into the buffer's copy of the vertex data
+    without marking the list as changed (reading vertex_list.colors would
+    re-upload the colors of the whole board); the cells written since the
+    last draw are uploaded one by one in draw().
+    """
+
+    EMPTY = (0, 0, 0, 0)
+
+    def __init__(self, ncells, cell, gap=1):
+        super(BoardRenderer, self).__init__()
+        self.ncells = ncells
+        self.cell = cell
+        self.gap = gap
+
+        h = cell / 2.
+        vertices = array('f')
+        for r in range(1, ncells + 1):
+            for c in range(1, ncells + 1):
+                x, y = grid2coord(c, r, cell, gap, gap)
+                vertices.extend((x - h, y - h, x + h, y - h, x + h, y + h, x - h, y + h))
+        n = 4 * ncells * ncells
+        self.vertex_list = pyglet.graphics.vertex_list(n, 'v2f/static', 'c4B/stream')
+        # copy the positions in one go, boards can have 250k cells
+        address, length = vertices.buffer_info()
+        ctypes.memmove(ctypes.addressof(self.vertex_list.vertices), address,
+                       length * vertices.itemsize)
+        self.dirty = []
+        self.version = None
+        self.clear()
+
+    def color_region(self):
+        """The colors of this list in the buffer, looked up again when the domain reallocates."""
+        domain = self.vertex_list.domain
+        if self.version != domain._version:
+            attribute = domain.attribute_names['colors']
+            start = self.vertex_list.start
+            self.color_buffer = attribute.buffer
+            self.color_offset = attribute.offset + attribute.stride * start
+            self.colors = attribute.get_region(attribute.buffer, start,
+                                               self.vertex_list.get_size()).array
+            self.version = domain._version
+        return self.colors
+
+    def set_cell(self, c, r, color):
+        i = ((r - 1) * self.ncells + (c - 1)) * 16
+        self.color_region()[i:i + 16] = color * 4
+        dirty = self.dirty
+        dirty.append(i)
+        # when many cells change without a draw in between, upload them all
+        if len(dirty) > 4096:
+            self.color_buffer.invalidate_region(self.color_offset, ctypes.sizeof(self.colors))
+            del dirty[:]
+
+    def clear(self):
+        colors = self.color_region()
+        ctypes.memset(ctypes.addressof(colors), 0, ctypes.sizeof(colors))
+        self.color_buffer.invalidate_region(self.color_offset, ctypes.sizeof(colors))
+        del self.dirty[:]
+
+    def upload(self):
+        address = ctypes.addressof(self.color_region())
+        buffer = self.color_buffer
+        # vertex arrays draw from the client copy directly
+        if isinstance(buffer, pyglet.graphics.vertexbuffer.VertexBufferObject):
+            buffer.bind()
+            for i in self.dirty:
+                glBufferSubData(buffer.target, self.color_offset + i, 16, address + i)
+            buffer.unbind()
+        del self.dirty[:]
+
+    def draw(self):
+        if self.dirty:
+            self.upload()
+        glPushMatrix()
+        self.transform()
+        self.vertex_list.draw(GL_QUADS)
+        glPopMatrix()
+
+    def delete(self):
+        self.vertex_list.delete()
@@ -0,0 +1,224 @@
+"""
+Reference controllers for headless games. A controller is called with the
+SnakeEngine before every tick and returns the direction to turn to, or 0
+to keep going. Classes are instantiated once per game.
+"""
+
+import math
+from random import Random
+
+from engine import SnakeEngine, MOVES
+from state import SnakeState
+from autopilot import Autopilot, INF
+from mcts import MCTSController
+
+class RandomController(object):
+    """Pick a random safe direction, seeded from the game seed."""
+
+    def __init__(self):
+        self.rng = None
+
+    def __call__(self, engine):
+        if self.rng is None:
+            self.rng = Random(engine.seed)
+        moves = engine.safe_moves()
+        if not moves:
+            return 0
+        return moves[int(len(moves) * self.rng.random())]
+
+def greedy_controller(engine):
+    """Step towards the food on a safe cell, ignoring what comes after."""
+    moves = engine.safe_moves()
+    if not moves:
+        return 0
+    c, r = engine.snake[0]
+    fc, fr = engine.food
+    def distance(d):
+        dc, dr = MOVES[d]
+        return abs(c + dc - fc) + abs(r + dr - fr)
+    return min(moves, key=distance)
+
+class PathController(object):
+    """
+    Follow a shortest path to the food that the snake can actually steer:
+    the search runs over (cell, direction, time of the next allowed turn)
+    so on a TurnLimitedEngine it only turns as often as the engine allows,
+    and a body cell is open once the tail has passed it. The path is kept
+    until the food moves or the game leaves it. Without a path the snake
+    goes straight: the food cannot be reached at this speed, and circling
+    the board instead would never end the game.
+    """
+
+    def __init__(self):
+        self.food = None
+        self.route = {}
+
+    def __call__(self, engine):
+        if engine.food is None:
+            return 0
+        head = engine.snake[0]
+        step = self.route.get(engine.ticks)
+        if engine.food != self.food or step is None or step[0] != head:
+            self.food = engine.food
+            self.route = find_path(engine)
+            step = self.route.get(engine.ticks)
+        if step is not None:
+            return step[1]
+        return 0
+
+def find_path(engine):
+    """
+    Breadth first search from the head to the food, returns {tick: (head,
+    direction)} for the ticks of the path, direction being the turn to
+    make on that tick or 0.
+    """
+    n = engine.ncells
+    length = len(engine.snake)
+    # segment m from the head is passed by the tail after length - m ticks
+    opens = {}
+    for m, (c, r) in enumerate(engine.snake):
+        opens[(r - 1) * n + (c - 1)] = length - m
+    fc, fr = engine.food
+    food = (fr - 1) * n + (fc - 1)
+    motor = getattr(engine, 'motor', 0.)
+    gap = int(math.ceil(motor / engine.speed - 1e-9)) if motor else 0
+    wait = getattr(engine, 'turn_ready', 0.) - engine.elapsed
+    first = int(math.ceil(wait / engine.speed - 1e-9)) if wait > 0 else 0
+    steps = {}
+    for d, (dc, dr) in MOVES.items():
+        steps[d] = (dc, dr, dr * n + dc)
+
+    # the nodes are states (cell, direction, first tick a turn is allowed)
+    c, r = engine.snake[0]
+    cells = [(r - 1) * n + (c - 1)]
+    directions = [engine.direction]
+    readies = [first]
+    parents = [-1]
+    best = [INF] * (4 * n * n)
+    frontier = [0]
+    t = 0
+    while frontier:
+        following = []
+        for k in frontier:
+            i = cells[k]
+            d = directions[k]
+            ready = readies[k]
+            r, c = divmod(i, n)
+            for nd in ((d, d % 4 + 1, (d + 2) % 4 + 1) if t >= ready else (d,)):
+                dc, dr, di = steps[nd]
+                if not (0 <= c + dc < n and 0 <= r + dr < n):
+                    continue
+                j = i + di
+                if j in opens and opens[j] > t + 1:
+                    continue
+                nready = ready if nd == d else t + gap
+                key = 4 * j + nd - 1
+                if best[key] <= nready:
+                    continue
+                best[key] = nready
+                cells.append(j)
+                directions.append(nd)
+                readies.append(nready)
+                parents.append(k)
+                if j == food:
+                    return route(engine, cells, directions, parents)
+                following.append(len(cells) - 1)
+        frontier = following
+        t += 1
+    return {}
+
+def route(engine, cells, directions, parents):
+    path = []
+    k = len(cells) - 1
+    while k >= 0:
+        path.append(k)
+        k = parents[k]
+    path.reverse()
+    n = engine.ncells
+    steps = {}
+    for t in range(len(path) - 1):
+        k = path[t]
+        d = directions[path[t + 1]]
+        r, c = divmod(cells[k], n)
+        steps[engine.ticks + t] = ((c + 1, r + 1), d if d != directions[k] else 0)
+    return steps
+
+class TurnLimitedEngine(SnakeEngine):
+    """A SnakeEngine that turns at most once per motor seconds of game time."""
+
+    def __init__(self, ncells, motor=.1):
+        super(TurnLimitedEngine, self).__init__(ncells)
+        self.motor = motor
+        self.turn_ready = 0.
+
+    def turn(self, direction):
+        if self.elapsed < self.turn_ready - 1e-9:
+            return False
+        if super(TurnLimitedEngine, self).turn(direction):
+            self.turn_ready = self.elapsed + self.motor
+            return True
+        return False
+
+class ReactionController(object):
+    """
+    A controller with a human's reaction time and turn rate. Every reaction
+    seconds of game time it plans: the controller plays ahead on a copy of
+    the game until the next decision, and the turns it made are made on
+    the same ticks of the real game, so the plan is followed between
+    decisions. Food placed during the plan is not seen until the next
+    decision; until then the snake goes straight, or turns only when it
+    would hit something.
+
+    Turns are at most one per motor seconds of game time. The copy is a
+    TurnLimitedEngine, so a controller like PathController plans within
+    the limit, and as the game speeds up the snake travels more cells
+    between turns.
+    """
+
+    def __init__(self, controller, reaction=.2, motor=.1):
+        if isinstance(controller, type):
+            controller = controller()
+        self.controller = controller
+        self.reaction = reaction
+        self.motor = motor
+        self.next_decision = 0.
+        self.turn_ready = 0.
+        self.plan = {}
+        self.scratch = None
+
+    def __call__(self, engine):
+        if engine.elapsed >= self.next_decision:
+            self.next_decision = engine.elapsed + self.reaction
+            self.plan = self.make_plan(engine)
+        direction = self.plan.pop(engine.ticks, 0)
+        if direction:
+            self.turn_ready = engine.elapsed + self.motor
+        return direction
+
+    def make_plan(self, engine):
+        """The turns of the ticks until the next decision, by tick."""
+        if self.scratch is None or self.scratch.ncells != engine.ncells:
+            self.scratch = TurnLimitedEngine(engine.ncells, self.motor)
+        game = SnakeState.from_engine(engine).restore(self.scratch)
+        game.turn_ready = self.turn_ready
+        del game.moves[:]
+        food_eaten = game.food_eaten
+        plan = {}
+        while not game.game_over:
+            if game.food_eaten == food_eaten:
+                direction = self.controller(game)
+            else:
+                moves = game.safe_moves()
+                direction = 0 if not moves or game.direction in moves else moves[0]
+            if direction and game.turn(direction):
+                plan[game.ticks] = direction
+            game.step()
+            if game.elapsed >= self.next_decision:
+                break
+        return plan
+
+CONTROLLERS = {'random': RandomController,
+               'greedy': greedy_controller,
+               'path': PathController,
+               'autopilot': Autopilot,
+               'mcts': MCTSController}
@@ -0,0 +1,228 @@
+from __future__ import division
+
+import math
+from array import array
+from random import Random
+from collections import deque
+
+UP = 1
+RIGHT = 2
+DOWN = 3
+LEFT = 4
+
+MOVES = {UP: (0, 1), RIGHT: (1, 0), DOWN: (0, -1), LEFT: (-1, 0)}
+
+# The conditions offered in the options menu
+BOARD_SIZES = list(range(11, 73, 2))
+LARGE_BOARD_SIZES = [101, 151, 201, 301, 401, 501]
+SPEED_FACTORS = [x / 1000.0 for x in range(750, 1000, 1)] + [1.000]
+
+class TurnQueue(object):
+    """
+    Buffers direction changes between ticks. A turn is accepted when it is a
+    quarter turn from the last queued direction (or the current direction if
+    the queue is empty), and the game consumes one turn per tick.
+    """
+
+    def __init__(self, maxlen=3):
+        self.maxlen = maxlen
+        self.queue = deque()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def push(self, direction, current, timestamp=None):
+        if len(self.queue) >= self.maxlen:
+            return False
+        last = self.queue[-1][0] if self.queue else current
+        if (last + direction) % 2 == 1:
+            self.queue.append((direction, timestamp))
+            return True
+        return False
+
+    def pop(self):
+        if self.queue:
+            return self.queue.popleft()
+        return None
+
+    def clear(self):
+        self.queue.clear()
+
+def duplicates(l):
+    return list(set([x for x in l if l.count(x) > 1]))
+
+class SnakeEngine(object):
+    """
+    Headless implementation of the Snake rules. Cells are (column, row)
+    tuples in 1..ncells, the body is a deque with the head at snake[0] and
+    the tail at snake[-1], so a move only touches its two ends.
+    
+    The cells covered by the body are also kept in a bytearray occupancy
+    grid which is updated as the head advances and the tail retracts, so
+    collision checks do not depend on the length of the snake.
+    
+    Empty cells are indexed by a dense list plus a position map (removal
+    swaps with the last entry), so food is placed uniformly at random in
+    constant time without retries.
+    
+    Every accepted turn is recorded in moves as a (tick, direction) pair,
+    which together with the seed passed to reset is enough to replay the
+    game exactly (see replay.py).
+    """
+
+    MOVED = 0
+    ATE = 1
+    HIT_WALL = 2
+    HIT_SELF = 3
+    BOARD_FULL = 4
+
+    def __init__(self, ncells, speed_factor=.99, rng=None):
+        self.ncells = ncells
+        self.speed_factor = speed_factor
+        self.rng = rng or Random()
+
+        self.seed = None
+        self.moves = []
+
+        self.snake = deque()
+        self.grid = bytearray(ncells * ncells)
+        # the initial free cell index, copied back on every reset
+        self.initial_free = array('i', range(0, ncells * ncells))
+        self.free = array('i', self.initial_free)
+        self.free_pos = array('i', self.initial_free)
+        self.food = None
+        self.direction = UP
+        self.speed = .1
+        self.score = 0
+        self.food_eaten = 0
+        self.ticks = 0
+        self.elapsed = 0.
+        self.game_over = True
+
+    def reset(self, seed=None):
+        """
+        Start a new game. The body, grid and free cell index of the previous
+        game are reused in place rather than reallocated.
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        self.seed = seed
+        del self.moves[:]
+
+        self.direction = UP
+        self.speed = .1
+        self.score = 0
+        self.food_eaten = 0
+        self.ticks = 0
+        self.elapsed = 0.
+
+        # Clear the old body from the grid and put the free index back in its
+        # initial order so food placement only depends on the seed.
+        while self.snake:
+            c, r = self.snake.pop()
+            self.grid[self.index(c, r)] = 0
+        self.free[:] = self.initial_free
+        self.free_pos[:] = self.initial_free
+
+        center = int(self.ncells / 2) + 1
+        for r in range(0, 3):
+            self.snake.append((center, center - r))
+            self.occupy(self.index(center, center - r))
+        self.spawn_food()
+
+        self.game_over = False
+
+    def index(self, c, r):
+        return (r - 1) * self.ncells + (c - 1)
+
+    def occupy(self, i):
+        self.grid[i] = 1
+        # swap the last free cell into the slot of the occupied one
+        pos = self.free_pos[i]
+        last = self.free.pop()
+        if last != i:
+            self.free[pos] = last
+            self.free_pos[last] = pos
+
+    def release(self, i):
+        self.grid[i] = 0
+        self.free_pos[i] = len(self.free)
+        self.free.append(i)
+
+    def safe_moves(self):
+        """Directions that do not end the game on the next tick."""
+        n = self.ncells
+        c, r = self.snake[0]
+        tail = self.snake[-1]
+        moves = []
+        for d, (dc, dr) in MOVES.items():
+            if d != self.direction and (d + self.direction) % 2 == 0:
+                continue
+            nc, nr = c + dc, r + dr
+            if nc < 1 or nc > n or nr < 1 or nr > n:
+                continue
+            # the tail moves out of the way unless the snake grows
+            if self.grid[(nr - 1) * n + (nc - 1)] and (nc, nr) != tail:
+                continue
+            moves.append(d)
+        return moves
+
+    def turn(self, direction):
+        """Change direction, only quarter turns are allowed."""
+        if (self.direction + direction) % 2 == 1:
+            self.direction = direction
+            self.moves.append((self.ticks, direction))
+            return True
+        return False
+
+    def spawn_food(self):
+        """Place food on a random empty cell, or None if the board is full."""
+        if not self.free:
+            self.food = None
+            return None
+        # int(random() * n) draws the same cells under Python 2 and 3
+        r, c = divmod(self.free[int(self.rng.random() * len(self.free))], self.ncells)
+        self.food = (c + 1, r + 1)
+        return self.food
+
+    def step(self):
+        mod = MOVES[self.direction]
+        c, r = self.snake[0]
+        nc = c + mod[0]
+        nr = r + mod[1]
+        self.ticks += 1
+        # game time, counting the interval each tick waited for
+        self.elapsed += self.speed
+
+        # First check if new head location is out of bounds
+        if nc < 1 or nc > self.ncells or nr < 1 or nr > self.ncells:
+            self.game_over = True
+            return self.HIT_WALL
+
+        # Now check to see if next cell is food. If it is, make the food location
+        # the new head of the snake.
+        if (nc, nr) == self.food:
+            self.food_eaten += 1
+            self.score += int(math.ceil((self.food_eaten - 1) * 1.5 + 10))
+            self.snake.appendleft(self.food)
+            self.occupy(self.index(nc, nr))
+            self.speed = self.speed * self.speed_factor
+            if self.spawn_food() is None:
+                self.game_over = True
+                return self.BOARD_FULL
+            return self.ATE
+
+        # Otherwise move snake, the tail retracts before the head advances
+        # so the head may follow directly behind it.
+        tc, tr = self.snake.pop()
+        self.release(self.index(tc, tr))
+
+        # Now check to see if there is a body collision
+        i = self.index(nc, nr)
+        if self.grid[i]:
+            self.game_over = True
+            return self.HIT_SELF
+
+        self.occupy(i)
+        self.snake.appendleft((nc, nr))
+        return self.MOVED
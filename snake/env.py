@@ -0,0 +1,109 @@
+"""
+Gym-style environments for training and evaluating controllers on the
+Snake task without a window.
+
+Actions are 0 to keep the current direction or one of the engine
+directions UP, RIGHT, DOWN, LEFT; reversals are ignored like in the game.
+The reward of a step is the increase of the task score. Observations are
+preallocated NumPy buffers that are updated in place on every call:
+
+    grid        (board_size, board_size) occupancy, indexed [row - 1, column - 1]
+    head        (column, row) of the head
+    food        (column, row) of the food
+    direction   current direction
+"""
+
+from random import Random
+
+import numpy as np
+
+from engine import SnakeEngine, UP, RIGHT, DOWN, LEFT
+from batch import BatchEngine
+
+ACTIONS = (0, UP, RIGHT, DOWN, LEFT)
+
+class SnakeEnv(object):
+
+    def __init__(self, board_size=31, speed_factor=.99, seed=None):
+        self.board_size = board_size
+        self.engine = SnakeEngine(board_size, speed_factor)
+        self.seeds = Random(seed)
+
+        # The engine keeps its occupancy grid in a bytearray which is reused
+        # across games, so the grid observation is a view onto it.
+        self.observation = {
+            'grid': np.frombuffer(self.engine.grid, dtype=np.uint8).reshape(board_size, board_size),
+            'head': np.zeros(2, dtype=np.int32),
+            'food': np.zeros(2, dtype=np.int32),
+            'direction': np.zeros(1, dtype=np.int8),
+        }
+
+    def _observe(self):
+        obs = self.observation
+        obs['head'][:] = self.engine.snake[0]
+        obs['food'][:] = self.engine.food or (0, 0)
+        obs['direction'][0] = self.engine.direction
+        return obs
+
+    def reset(self):
+        self.engine.reset(self.seeds.getrandbits(32))
+        return self._observe()
+
+    def step(self, action):
+        if action:
+            self.engine.turn(action)
+        score = self.engine.score
+        result = self.engine.step()
+        info = {'result': result, 'score': self.engine.score,
+                'food_eaten': self.engine.food_eaten, 'ticks': self.engine.ticks}
+        return self._observe(), self.engine.score - score, self.engine.game_over, info
+
+class VectorSnakeEnv(object):
+    """
+    Steps num_envs games per call on a BatchEngine. Games that finish are
+    reset automatically; their final score and tick count are reported in
+    info for that step.
+    """
+
+    def __init__(self, num_envs, board_size=31, speed_factor=.99, seed=None):
+        self.num_envs = num_envs
+        self.board_size = board_size
+        self.engine = BatchEngine(num_envs, board_size, speed_factor, seed)
+
+        self.observation = {
+            'grid': self.engine.board,
+            'head': self.engine.head,
+            'food': np.zeros((num_envs, 2), dtype=np.int32),
+            'direction': self.engine.direction,
+        }
+        self.rewards = np.zeros(num_envs, dtype=np.int64)
+        self.dones = np.zeros(num_envs, dtype=bool)
+        self.final_score = np.zeros(num_envs, dtype=np.int64)
+        self.final_ticks = np.zeros(num_envs, dtype=np.int64)
+        self.results = np.zeros(num_envs, dtype=np.int8)
+
+    def _observe(self):
+        food = self.engine.food
+        np.remainder(food, self.board_size, out=self.observation['food'][:, 0])
+        np.floor_divide(food, self.board_size, out=self.observation['food'][:, 1])
+        self.observation['food'] += 1
+        return self.observation
+
+    def reset(self):
+        self.engine.reset()
+        return self._observe()
+
+    def step(self, actions):
+        engine = self.engine
+        np.copyto(self.rewards, engine.score)
+        engine.step(actions)
+        np.subtract(engine.score, self.rewards, out=self.rewards)
+        np.logical_not(engine.alive, out=self.dones)
+        np.copyto(self.results, engine.result)
+        np.copyto(self.final_score, engine.score)
+        np.copyto(self.final_ticks, engine.ticks)
+        if self.dones.any():
+            engine.reset(self.dones)
+        info = {'result': self.results, 'final_score': self.final_score,
+                'final_ticks': self.final_ticks}
+        return self._observe(), self.rewards, self.dones, info
@@ -1,6 +1,7 @@
 import time
 
 from util import screenshot
+from profiling import ProfileCapture
 
 from pyglet.window import key
 
@@ -9,6 +10,7 @@ from cocos.director import director
 class DefaultHandler(object):
     def __init__(self):
         super(DefaultHandler, self).__init__()
+        self.capture = ProfileCapture()
 
     def on_key_press(self, symbol, modifiers):
         if symbol == key.F and (modifiers & key.MOD_ACCEL):
@@ -22,3 +24,7 @@ class DefaultHandler(object):
         elif symbol == key.S and (modifiers & key.MOD_ACCEL):
             screenshot().save('screenshot-%d.png' % (int(time.time())))
             return True
+
+        elif symbol == key.P and (modifiers & key.MOD_ACCEL):
+            self.capture.toggle()
+            return True
@@ -40,7 +40,7 @@ from cocos.collision_model import *
 import cocos.euclid as eu
 from pyglet.media import StaticSource
 
-from random import choice, randrange, uniform, sample, shuffle
+from random import choice, randrange, uniform, sample, shuffle, Random
 import string
 
 from primitives import Polygon, Rect
@@ -51,6 +51,15 @@ from util import hsv_to_rgb, screenshot
 from handler import DefaultHandler
 from menu import BetterMenu, GhostMenuItem, BetterEntryMenuItem
 from scene import Scene
+from engine import SnakeEngine, TurnQueue, UP, RIGHT, DOWN, LEFT, BOARD_SIZES, LARGE_BOARD_SIZES, SPEED_FACTORS
+from replay import write_game
+from ticker import TickScheduler
+from board import BoardRenderer, cell_size, board_width
+from autopilot import Autopilot
+from mcts import MCTSPlayer
+from overlay import FrameTimeOverlay
+from profiling import SessionSampler
+import tracing
 
 from odict import OrderedDict
 
@@ -67,9 +76,6 @@ from cStringIO import StringIO
 import tarfile
 import json
 
-def duplicates(l):
-    return list(set([x for x in l if l.count(x) > 1]))
-
 class OptionsMenu(BetterMenu):
 
     def __init__(self):
@@ -91,12 +97,13 @@ class OptionsMenu(BetterMenu):
         self.font_item_selected['color'] = (0, 0, 255, 255)
         self.font_item_selected['font_size'] = self.screen[1] / 16 * ratio
         
-        self.board_sizes = map(str,range(11, 51, 2))
-        self.speed_factors = map(lambda(x): "%.3f" % x, [x / 1000.0 for x in range(750, 1000, 1)] + [1.000])
+        self.board_sizes = map(str, BOARD_SIZES + LARGE_BOARD_SIZES)
+        self.speed_factors = map(lambda(x): "%.3f" % x, SPEED_FACTORS)
         
         self.items = OrderedDict()
         
         self.items['fps'] = ToggleMenuItem('Show FPS:', self.on_show_fps, director.show_FPS)
+        self.items['trace'] = ToggleMenuItem('Trace:', self.on_trace, director.settings['trace'])
         self.items['fullscreen'] = ToggleMenuItem('Fullscreen:', self.on_fullscreen, director.window.fullscreen)
         self.items['board_size'] = MultipleMenuItem('Board Size:', self.on_board_size, self.board_sizes, self.board_sizes.index(director.settings['board_size']))
         self.items['speed_factor'] = MultipleMenuItem('Speed Factor:', self.on_speed_factor, self.speed_factors, self.speed_factors.index(director.settings['speed_factor']))
@@ -125,14 +132,21 @@ class OptionsMenu(BetterMenu):
             director.scene.dispatch_event("eyetracker_info_changed")
     
     def on_board_size(self, value):
-        director.settings["board_size"] = value
+        director.settings["board_size"] = self.board_sizes[value]
         
     def on_speed_factor(self, value):
-        director.settings["speed_factor"] = value
+        director.settings["speed_factor"] = self.speed_factors[value]
         
     def on_show_fps(self, value):
         director.show_FPS = value
         
+    def on_trace(self, value):
+        director.settings['trace'] = value
+        if value:
+            tracing.enable()
+        else:
+            tracing.disable()
+        
     def on_fullscreen(self, value):
         screen = pyglet.window.get_platform().get_default_display().get_default_screen()
         director.window.set_fullscreen(value, screen)
@@ -313,23 +327,6 @@ class TaskBackground(Layer):
         self.add(s)
         self.add(ColorLayer(128,128,128,128),z=1)
         
-def grid2coord(c, r, cell, pad=1):
-        x = (c - .5) * cell + c + pad
-        y = (r - .5) * cell + r + pad
-        return((x,y))
-        
-class GridSquare(Sprite):
-    
-    def __init__(self, c, r, size, opacity=255, color=(255, 255, 255)):
-        self.grid_loc = (c, r)
-        self.size = size
-        img = SolidColorImagePattern((255,255,255,255)).create_image(size, size)
-        super(GridSquare, self).__init__(img, position=grid2coord(c, r, size), color=color, opacity=opacity)
-        
-    def set_grid_loc(self, (c, r)):
-        self.grid_loc = (c, r)
-        self.position = grid2coord(c, r, self.size)
-        
 class MoveWithCallback(MoveBy):
     
     def init(self, delta, cb):
@@ -352,6 +349,11 @@ class Score(ColorLayer):
                                           batch=self.text_batch.batch)
         self.add(self.text_batch)
         
+    def resize(self, width, x, y):
+        self.width = width
+        self.position = (x, y)
+        self.score_label.x = width / 2
+        
     def set_score(self, value):
         self.score_label.begin_update()
         self.score_label.text = str(value)
@@ -372,154 +374,199 @@ class Task(ColorLayer, pyglet.event.EventDispatcher):
     STATE_PLAY = 5
     STATE_GAME_OVER = 6
     
+    SNAKE_COLOR = (255, 255, 255, 255)
+    REBUILD_BUDGET = 20000
+    FOOD_COLOR = (255, 0, 0, 255)
+    
     is_event_handler = True
     
     def __init__(self, client, actr):
         self.screen = director.get_window_size()
-        self.ncells = int(director.settings['board_size'])
         self.scorepad = int(self.screen[1] * .025)
-        self.cell = int((self.screen[1]-self.scorepad) / self.ncells * .1) * 10
-        print self.cell
-        width = self.ncells * self.cell + self.ncells + 1
         
-        super(Task, self).__init__(0, 0, 0, 255, width, width)
-        self.position = ((self.screen[0]-width)/2, (self.screen[1]-width)/2-self.scorepad)
+        super(Task, self).__init__(0, 0, 0, 255)
         
-        self.score_layer = Score(width, 2*self.scorepad, self.position[0], self.position[1]+width+self.scorepad/2)
-        self.score = 0
-        self.food_eaten = 0
+        self.score_layer = Score(self.screen[1], 2*self.scorepad, 0, 0)
         
-        self.speed_factor = float(director.settings['speed_factor'])
+        self.ticker = TickScheduler(self.move_snake_body, .1)
+        self.turns = TurnQueue()
+        self.latencies = []
+        self.autopilot = None
+        self.mcts = None
         
         self.state = self.STATE_INIT
         
-        self.snake = None
-        self.food = None
-        self.ready = False
+        self.ncells = None
+        self.speed_factor = None
+        self.board = None
+        self.text_batch = None
+        self.setup()
         
         self.blop = StaticSource(pyglet.resource.media('blop.mp3'))
         self.laugh = StaticSource(pyglet.resource.media('laugh.mp3'))
         
+    def setup(self):
+        """
+        Size the board and build the engine and renderer for the board size
+        and speed factor settings, which may have changed in the options menu.
+        """
+        ncells = int(director.settings['board_size'])
+        speed_factor = float(director.settings['speed_factor'])
+        if (ncells, speed_factor) == (self.ncells, self.speed_factor):
+            return
+        self.speed_factor = speed_factor
+        if ncells == self.ncells:
+            self.engine.speed_factor = speed_factor
+            return
+        self.ncells = ncells
+        self.engine = SnakeEngine(self.ncells, self.speed_factor)
+        
+        self.cell, self.gap = cell_size(self.screen[1]-self.scorepad, self.ncells)
+        width = int(math.ceil(board_width(self.ncells, self.cell, self.gap)))
+        self.width = self.height = width
+        self.position = ((self.screen[0]-width)/2, (self.screen[1]-width)/2-self.scorepad)
+        self.score_layer.resize(width, self.position[0], self.position[1]+width+self.scorepad/2)
+        
+        if self.board:
+            self.remove(self.board)
+            self.board.delete()
+        self.board = BoardRenderer(self.ncells, self.cell, self.gap)
+        self.add(self.board)
+        
+        if self.text_batch in self.get_children():
+            self.remove(self.text_batch)
         self.text_batch = BatchNode()
-        self.game_over_label = text.Label("GAME OVER", font_size=int(self.cell*3),
+        # Large boards have small cells, so the labels follow the board width
+        label_size = max(self.cell, width / 35)
+        self.game_over_label = text.Label("GAME OVER", font_size=int(label_size*3),
                                           x= width / 2, y= width / 2, font_name="Pipe Dream",
                                           color=(255,255,255,255), anchor_x='center', anchor_y='bottom',
                                           batch=self.text_batch.batch)
-        self.game_over_label = text.Label("Press Spacebar For New Game", font_size=int(self.cell*1.5),
+        self.game_over_label = text.Label("Press Spacebar For New Game", font_size=int(label_size*1.5),
                                           x= width / 2, y= width / 2, font_name="Pipe Dream",
                                           color=(255,255,255,255), anchor_x='center', anchor_y='top',
                                           batch=self.text_batch.batch)
         
-    def get_move_by(self):
-        if self.movement_direction == 1:
-            return (0, 1)
-        elif self.movement_direction == 2:
-            return (1, 0)
-        elif self.movement_direction == 3:
-            return (0, -1)
-        elif self.movement_direction == 4:
-            return (-1, 0)
-        
+    @tracing.traced('tick')
     def move_snake_body(self, dt):
-        mod = self.get_move_by()
-        c,r = self.snake[0].grid_loc
-        nc = c + mod[0]
-        nr = r + mod[1]
-        
-        # First check if new head location is out of bounds
-        if nc < 1 or nc > self.ncells or nr < 1 or nr > self.ncells:
+        if self.autopilot:
+            direction = self.autopilot(self.engine)
+            if direction:
+                self.engine.turn(direction)
+        elif self.mcts:
+            direction = self.mcts.poll()
+            if direction:
+                self.engine.turn(direction)
+        
+        turn = self.turns.pop()
+        if turn:
+            direction, timestamp = turn
+            self.engine.turn(direction)
+            self.latencies.append(get_time() - timestamp)
+        
+        tail = self.engine.snake[-1]
+        result = self.engine.step()
+        
+        if self.engine.game_over:
             self.game_over()
             return
         
-        # Now check to see if next cell is food. If it is, make the food location
-        # the new head of the snake.
-        if (nc,nr) == self.food.grid_loc:
-            self.food_eaten += 1
-            self.score += int(math.ceil((self.food_eaten-1) * 1.5 + 10))
-            self.score_layer.set_score(self.score)
+        # The food cell becomes the new head of the snake.
+        if result == SnakeEngine.ATE:
+            self.score_layer.set_score(self.engine.score)
             self.blop.play()
-            self.food.color = (255,255,255)
-            self.snake = [self.food] + self.snake
             self.spawn_food()
-            self.speed = self.speed * self.speed_factor
             
-        # Otherwise move snake
+        # Otherwise the tail cell is freed
         else:
-            # starting at the tail and moving towards the head, move each body
-            # segment to the preceeding body segment location
-            for i in range(1,len(self.snake))[::-1]:
-                self.snake[i].set_grid_loc(self.snake[i-1].grid_loc)
-            # finally move the snake head to the new location
-            self.snake[0].set_grid_loc((nc,nr))
+            self.board.set_cell(tail[0], tail[1], BoardRenderer.EMPTY)
+        
+        c, r = self.engine.snake[0]
+        self.board.set_cell(c, r, self.SNAKE_COLOR)
         
-            # Now check to see if there is a body collision
-            if duplicates([tuple(cell.grid_loc) for cell in self.snake]):
-                self.game_over()
-                return
+        # Search the next move on the worker pool until shortly before the next tick
+        if self.mcts:
+            self.mcts.start(self.engine, self.engine.speed * .8)
         
-        pyglet.clock.schedule_once(self.move_snake_body, self.speed)
-        self.ready = True
+        self.ticker.interval = self.engine.speed
+        
+    def write_game(self, finished):
+        write_game("data/%s.replay" % director.settings['filebase'], self.engine,
+                   session_seed=self.session_seed, game=self.game, latencies=self.latencies,
+                   finished=finished)
+        
+    def abandon(self):
+        """Record a game that is left before it ends as unfinished."""
+        if self.state == self.STATE_PLAY:
+            self.write_game(False)
+            self.state = self.STATE_INIT
         
     def game_over(self):
         self.laugh.play()
+        self.write_game(True)
         self.state = self.STATE_GAME_OVER
-        self.snake[0].stop()
-        self.ready = False
+        self.ticker.stop()
+        self.turns.clear()
         self.clear()
         self.add(self.text_batch, z=1)
         
     def spawn_food(self):
-        cont = True
-        while cont:
-            cont = False
-            c = (choice(range(0, self.ncells)) + 1)
-            r = (choice(range(0, self.ncells)) + 1)
-            for s in self.snake:
-                if s.grid_loc == (c,r):
-                    cont = True
-                    break
-            if not cont:
-                self.food = GridSquare(c, r, self.cell, color=(255, 0, 0))
-                self.add(self.food)
+        c, r = self.engine.food
+        self.board.set_cell(c, r, self.FOOD_COLOR)
         
     def clear(self):
-        if self.snake:
-            map(self.remove, self.snake)
-            self.snake = None
-        if self.food:
-            self.remove(self.food)
-            self.food = None
+        self.board.clear()
         
     def reset(self):
-        self.movement_direction = 1
-        self.speed = .1
-        
-        self.score = 0
-        self.score_layer.set_score(self.score)
+        self.game += 1
+        self.engine.reset(self.seeds.getrandbits(32))
+        self.turns.clear()
+        self.latencies = []
+        if director.settings['player'] == 'Autopilot':
+            # a rebuild covers at most REBUILD_BUDGET cells per tick
+            self.autopilot = Autopilot(self.REBUILD_BUDGET)
+            self.autopilot.prepare(self.engine.ncells)
+        else:
+            self.autopilot = None
+        if director.settings['player'] == 'MCTS':
+            if not self.mcts:
+                self.mcts = MCTSPlayer()
+        elif self.mcts:
+            self.mcts.close()
+            self.mcts = None
+        self.score_layer.set_score(self.engine.score)
         
         self.clear()
         
-        center = int(self.ncells/2) + 1
-        self.snake = [GridSquare(center, center, self.cell)]
-        self.add(self.snake[0])
-        
-        for r in range(1, 3):
-            self.snake.append(GridSquare(center, center-r, self.cell))
-            self.add(self.snake[-1])
+        for c, r in self.engine.snake:
+            self.board.set_cell(c, r, self.SNAKE_COLOR)
             
         self.spawn_food()
         
         self.state = self.STATE_PLAY
-        pyglet.clock.schedule_once(self.move_snake_body, 2)
+        self.ticker.interval = self.engine.speed
+        self.ticker.start(2)
+        if self.mcts:
+            self.mcts.start(self.engine, 1.5)
         
     def one_time(self):
         if director.settings['eyetracker'] and director.settings['fixation_overlay']:
             self.dispatch_event("show_fixation")
             
     def on_enter(self):
+        # before the transition shows the board, and before the score layer
+        # enters with its new width
+        self.setup()
         if isinstance(director.scene, TransitionScene): return
         super(Task, self).on_enter()
         
+        # Every session draws the food seed of each game from its own stream
+        self.session_seed = director.settings['seed']
+        if self.session_seed is None:
+            self.session_seed = randrange(2**32)
+        self.seeds = Random(self.session_seed)
+        self.game = 0
+        
         if director.settings['eyetracker']:
             self.state = self.STATE_CALIBRATE
             self.dispatch_event("start_calibration", self.calibration_ok, self.calibration_bad)
@@ -538,57 +585,71 @@ class Task(ColorLayer, pyglet.event.EventDispatcher):
     def on_exit(self):
         if isinstance(director.scene, TransitionScene): return
         super(Task, self).on_exit()
+        self.ticker.stop()
+        self.abandon()
         self.clear()
         if director.settings['eyetracker'] and director.settings['fixation_overlay']:
             self.dispatch_event("hide_fixation")
         
     if ACTR6:
         @actr_d.listen('connectionMade')
+        @tracing.traced('ACT-R connectionMade')
         def ACTR6_JNI_Event(self, model, params):
             pass
             
         @actr_d.listen('connectionLost')
+        @tracing.traced('ACT-R connectionLost')
         def ACTR6_JNI_Event(self, model, params):
             pass
             
         @actr_d.listen('reset')
+        @tracing.traced('ACT-R reset')
         def ACTR6_JNI_Event(self, model, params):
             pass
             
         @actr_d.listen('model-run')
+        @tracing.traced('ACT-R model-run')
         def ACTR6_JNI_Event(self, model, params):
             pass
             
         @actr_d.listen('model-stop')
+        @tracing.traced('ACT-R model-stop')
         def ACTR6_JNI_Event(self, model, params):
             pass
 
         @actr_d.listen('gaze-loc')
+        @tracing.traced('ACT-R gaze-loc')
         def ACTR6_JNI_Event(self, model, params):
             pass
             
         @actr_d.listen('attention-loc')
+        @tracing.traced('ACT-R attention-loc')
         def ACTR6_JNI_Event(self, model, params):
             pass
 
         @actr_d.listen('keypress')
+        @tracing.traced('ACT-R keypress')
         def ACTR6_JNI_Event(self, model, params):
             pass
 
         @actr_d.listen('mousemotion')
+        @tracing.traced('ACT-R mousemotion')
         def ACTR6_JNI_Event(self, model, params):
             pass
 
         @actr_d.listen('mouseclick')
+        @tracing.traced('ACT-R mouseclick')
         def ACTR6_JNI_Event(self, model, params):
             pass
     
     if eyetracking:
         @d.listen('ET_FIX')
+        @tracing.traced('iViewX ET_FIX')
         def iViewXEvent(self, inResponse):
             pass
             
         @d.listen('ET_SPL')
+        @tracing.traced('iViewX ET_SPL')
         def iViewXEvent(self, inResponse):
             pass
         
@@ -603,21 +664,15 @@ class Task(ColorLayer, pyglet.event.EventDispatcher):
         if symbol == key.W and (modifiers & key.MOD_ACCEL):
             director.scene.dispatch_event("show_intro_scene")
             True
-        if self.state == self.STATE_PLAY:
-            if self.ready:
-                self.ready = False
-                if symbol == key.UP:
-                    if self.movement_direction == 2 or self.movement_direction == 4:
-                        self.movement_direction = 1
-                elif symbol == key.DOWN:
-                    if self.movement_direction == 2 or self.movement_direction == 4:
-                        self.movement_direction = 3
-                elif symbol == key.RIGHT:
-                    if self.movement_direction == 1 or self.movement_direction == 3:
-                        self.movement_direction = 2
-                elif symbol == key.LEFT:
-                    if self.movement_direction == 1 or self.movement_direction == 3:
-                        self.movement_direction = 4
+        if self.state == self.STATE_PLAY and not (self.autopilot or self.mcts):
+            if symbol == key.UP:
+                self.turns.push(UP, self.engine.direction, get_time())
+            elif symbol == key.DOWN:
+                self.turns.push(DOWN, self.engine.direction, get_time())
+            elif symbol == key.RIGHT:
+                self.turns.push(RIGHT, self.engine.direction, get_time())
+            elif symbol == key.LEFT:
+                self.turns.push(LEFT, self.engine.direction, get_time())
         elif self.state == self.STATE_GAME_OVER:
             if symbol == key.SPACE:
                 self.remove(self.text_batch)
@@ -697,9 +752,13 @@ class SnakeEnvironment(object):
                              'eyetracker_in_port': '5555',
                              'board_size': '31',
                              'speed_factor': '0.990',
+                             'seed': None,
                              'fixation_overlay': False,
                              'player': 'Human',
-                             'players': ['Human']}
+                             'players': ['Human', 'Autopilot', 'MCTS'],
+                             'sampler_interval': .01,
+                             'hitch_threshold': .1,
+                             'trace': False}
         
         self.client = None
         self.client_actr = None
@@ -714,11 +773,6 @@ class SnakeEnvironment(object):
             self.client = iViewXClient(director.settings['eyetracker_ip'], int(director.settings['eyetracker_out_port']))
             self.listener = reactor.listenUDP(int(director.settings['eyetracker_in_port']), self.client) 
         
-        director.fps_display = clock.ClockDisplay(font=font.load('', 18, bold=True))
-        #fps_display = FPSDisplay(director.window)
-        #fps_display.label.font_size = 12
-        #director.fps_display = fps_display
-
         director.set_show_FPS(True)
         director.window.set_fullscreen(False)
         director.window.set_mouse_visible(False)
@@ -749,6 +803,15 @@ class SnakeEnvironment(object):
         self.taskBackgroundLayer = TaskBackground()
         self.taskLayer = Task(self.client, self.client_actr)
         self.scoreLayer = self.taskLayer.score_layer
+
+        director.fps_display = FrameTimeOverlay(director.window, self.taskLayer.ticker, reactor)
+        self.sampler = SessionSampler(director.window,
+                                      interval=director.settings['sampler_interval'],
+                                      threshold=director.settings['hitch_threshold'])
+        self.sampler.start()
+        tracing.trace_window(director.window)
+        if director.settings['trace']:
+            tracing.enable()
         self.actrScrim = ACTRScrim()
         
         if self.client:
@@ -841,3 +904,7 @@ def main():
     snake = SnakeEnvironment()
     snake.show_intro_scene()
     reactor.run()
+    # quitting does not exit the task scene
+    snake.taskLayer.abandon()
+    snake.sampler.close()
+    tracing.export(os.path.join('data', 'trace_%s.json' % getDateTimeStamp()))
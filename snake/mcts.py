@@ -0,0 +1,214 @@
+"""
+Monte Carlo tree search player.
+
+The search is open loop: the tree is built over sequences of directions
+and every iteration replays them on a fresh copy of the root SnakeState,
+so random food placement is sampled rather than stored in the tree.
+Leaves are scored by a random rollout over safe moves; the value of a
+simulation is the food eaten minus one if the snake died.
+
+MCTSController searches synchronously and fits the controller protocol
+of the tournament and sweep tools. MCTSPlayer runs root-parallel
+searches on a process pool and never blocks the caller, which is how
+Task uses it between ticks. The pool leaves one core to the caller, and
+every search stops at an absolute deadline or as soon as a newer search
+is started, so late searches never queue up behind each other.
+
+Rather than a snapshot of the board, MCTSPlayer sends the workers the
+seed and the turns of the game, which they replay on an engine of their
+own that is kept between searches; a search only steps that engine over
+the ticks since the last one, whatever the size of the board.
+"""
+
+import math
+import time
+import multiprocessing
+from array import array
+from random import Random
+
+from engine import SnakeEngine
+from state import SnakeState
+
+class Node(object):
+
+    __slots__ = ('children', 'visits', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.visits = 0
+        self.value = 0.
+
+def search(state, seconds=None, iterations=None, seed=None, depth=None, exploration=1.,
+           deadline=None, cancelled=None):
+    """
+    Search from state until seconds have passed, the deadline (a
+    time.time() value) is reached, iterations are done or cancelled()
+    returns true. Returns {direction: [visits, total value]} for the
+    root moves.
+    """
+    rng = Random(seed)
+    depth = depth or 2 * state.ncells
+    root = Node()
+    if seconds is not None:
+        deadline = min(deadline or float('inf'), time.time() + seconds)
+    done = 0
+    while True:
+        if iterations is not None and done >= iterations:
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+        if cancelled is not None and cancelled():
+            break
+        done += 1
+
+        s = state.copy()
+        food = s.food_eaten
+        path = [root]
+        node = root
+
+        # selection and expansion
+        while not s.game_over:
+            moves = s.safe_moves()
+            if not moves:
+                s.step(0)
+                break
+            unexplored = [d for d in moves if d not in node.children]
+            if unexplored:
+                d = unexplored[int(rng.random() * len(unexplored))]
+                node.children[d] = child = Node()
+                s.step(d)
+                path.append(child)
+                break
+            log_n = math.log(node.visits)
+            def ucb(d):
+                child = node.children[d]
+                return child.value / child.visits + exploration * math.sqrt(log_n / child.visits)
+            d = max(moves, key=ucb)
+            node = node.children[d]
+            s.step(d)
+            path.append(node)
+
+        # rollout
+        for _ in range(depth):
+            if s.game_over:
+                break
+            moves = s.safe_moves()
+            s.step(moves[int(rng.random() * len(moves))] if moves else 0)
+
+        value = s.food_eaten - food - (1 if s.game_over else 0)
+        for n in path:
+            n.visits += 1
+            n.value += value
+
+    return dict((d, [child.visits, child.value]) for d, child in root.children.items())
+
+def best_move(stats):
+    if not stats:
+        return 0
+    return max(stats, key=lambda d: (stats[d][0], stats[d][1]))
+
+# the generation of the newest search, shared with the pool workers
+_generation = None
+# the game each worker replays, [game, engine, turns replayed]
+_game = None
+
+def _init_worker(generation):
+    global _generation
+    _generation = generation
+
+def _replay(game, moves, ticks):
+    """
+    The worker's engine advanced to ticks of game, an (ncells, speed_factor,
+    seed, number) tuple, with moves the flattened (tick, direction) turns.
+    """
+    global _game
+    if _game is None or _game[0] != game or _game[1].ticks > ticks:
+        ncells, speed_factor, seed, _ = game
+        engine = SnakeEngine(ncells, speed_factor)
+        engine.reset(seed)
+        _game = [game, engine, 0]
+    engine = _game[1]
+    n = _game[2]
+    while True:
+        while n < len(moves) and moves[n] == engine.ticks:
+            engine.turn(moves[n + 1])
+            n += 2
+        if engine.ticks >= ticks or engine.game_over:
+            break
+        engine.step()
+    _game[2] = n
+    return engine
+
+def _search(args):
+    game, moves, ticks, deadline, iterations, seed, generation = args
+    cancelled = lambda: _generation.value != generation
+    # searches started before the worker got to them are skipped
+    if cancelled() or time.time() >= deadline:
+        return {}
+    state = SnakeState.from_engine(_replay(game, moves, ticks))
+    return search(state, iterations=iterations, seed=seed, deadline=deadline,
+                  cancelled=cancelled)
+
+class MCTSController(object):
+
+    def __init__(self, seconds=None, iterations=200):
+        self.seconds = seconds
+        self.iterations = iterations
+
+    def __call__(self, engine):
+        state = SnakeState.from_engine(engine)
+        return best_move(search(state, self.seconds, self.iterations,
+                                seed=(engine.seed or 0) * 100003 + engine.ticks))
+
+class MCTSPlayer(object):
+    """
+    Call start() after a tick to search the new state on the pool for up to
+    seconds, and poll() at the next tick for the chosen direction (0 if no
+    search has finished). Starting a search cancels the previous one.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or max(1, multiprocessing.cpu_count() - 1)
+        self.generation = multiprocessing.RawValue('i', 0)
+        self.pool = multiprocessing.Pool(self.processes, _init_worker, (self.generation,))
+        self.pending = []
+        self.rng = Random()
+        self.games = 0
+        self.ticks = 0
+        self.moves = array('i')
+
+    def start(self, engine, seconds):
+        deadline = time.time() + seconds
+        self.generation.value += 1
+        generation = self.generation.value
+        # a new game starts over at a lower tick
+        if engine.ticks < self.ticks or not self.games:
+            self.games += 1
+            self.moves = array('i')
+        self.ticks = engine.ticks
+        for tick, direction in engine.moves[len(self.moves) // 2:]:
+            self.moves.append(tick)
+            self.moves.append(direction)
+        game = (engine.ncells, engine.speed_factor, engine.seed, self.games)
+        # the pool pickles the arguments later on its own thread
+        moves = self.moves[:]
+        self.pending = [self.pool.apply_async(_search, ((game, moves, engine.ticks, deadline,
+                                                          None, self.rng.random(), generation),))
+                        for _ in range(self.processes)]
+
+    def poll(self):
+        """Combine the searches that finished, the others are dropped."""
+        stats = {}
+        for r in self.pending:
+            if not r.ready():
+                continue
+            for d, (visits, value) in r.get().items():
+                total = stats.setdefault(d, [0, 0.])
+                total[0] += visits
+                total[1] += value
+        self.pending = []
+        return best_move(stats)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
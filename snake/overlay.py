@@ -0,0 +1,133 @@
+"""
+Frame time overlay, a replacement for pyglet's ClockDisplay.
+
+ClockDisplay shows an average frame rate which hides single long frames.
+FrameTimeOverlay records the time between window draws whether or not it
+is shown, and draws a graph of the recent frame times with the 60 Hz and
+30 Hz budgets marked, followed by the p50/p95/p99 frame times, the time
+spent in the tick callback, the time spent making queued reactor calls
+with the depth of the reactor queue and how long calls waited in it, and
+the overrun and dropped tick counts of the TickScheduler.
+
+Set it as director.fps_display; director.show_FPS (Ctrl+X) toggles it.
+"""
+
+from collections import deque
+
+import pyglet
+from pyglet.gl import *
+
+def percentile(samples, p):
+    if not samples:
+        return 0.
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100.))]
+
+class FrameTimeOverlay(object):
+
+    # frame time at the top of the graph, in seconds
+    SCALE = .05
+    BUDGETS = (1 / 60., 1 / 30.)
+
+    def __init__(self, window, ticker=None, reactor=None, samples=240,
+                 x=10, y=10, height=80, update_interval=.25):
+        self.window = window
+        self.ticker = ticker
+        self.reactor = reactor
+        self.x = x
+        self.y = y
+        self.height = height
+        self.update_interval = update_interval
+        self.time = pyglet.clock.get_default().time
+
+        self.frames = deque(maxlen=samples)
+        self.last_frame = None
+        self.last_update = 0
+
+        self.graph = pyglet.graphics.vertex_list(samples, 'v2f/stream',
+                                                 ('c3B/static', (0, 255, 0) * samples))
+        lines = []
+        for budget in self.BUDGETS:
+            h = y + budget / self.SCALE * height
+            lines.extend((x, h, x + samples, h))
+        self.budgets = pyglet.graphics.vertex_list(len(lines) // 2, ('v2f/static', lines),
+                                                   ('c3B/static', (128, 128, 128) * (len(lines) // 2)))
+        self.label = pyglet.text.Label('', font_size=10, x=x, y=y + height + 4,
+                                       width=800, multiline=True, anchor_y='bottom',
+                                       color=(255, 255, 255, 255))
+
+        window.push_handlers(on_draw=self.on_draw)
+
+    def on_draw(self):
+        now = self.time()
+        if self.last_frame is not None:
+            self.frames.append(now - self.last_frame)
+        self.last_frame = now
+
+    def update_label(self):
+        frames = sorted(self.frames)
+        lines = ['frame  p50 %5.1f  p95 %5.1f  p99 %5.1f  max %5.1f ms' %
+                 tuple(v * 1000 for v in (percentile(frames, 50), percentile(frames, 95),
+                                          percentile(frames, 99), frames[-1] if frames else 0.))]
+        if self.ticker:
+            ticks = sorted(self.ticker.callback_times)
+            lines.append('tick   p50 %5.2f  p99 %5.2f ms  overruns %d  dropped %d' %
+                         (percentile(ticks, 50) * 1000, percentile(ticks, 99) * 1000,
+                          self.ticker.overruns, self.ticker.dropped))
+        loop = getattr(self.reactor, 'pygletEventLoop', None)
+        calls = getattr(loop, 'call_times', None)
+        if calls is not None:
+            calls = sorted(calls)
+            line = 'reactor p50 %5.2f  p99 %5.2f ms' % (percentile(calls, 50) * 1000,
+                                                       percentile(calls, 99) * 1000)
+            # only the threaded reactor queues its calls
+            if hasattr(loop, 'depths'):
+                latencies = sorted(loop.latencies)
+                line += '  queue %d (max %d)  latency p99 %5.2f ms' % (
+                    loop.depths[-1] if loop.depths else 0, loop.max_depth,
+                    percentile(latencies, 99) * 1000)
+            lines.append(line)
+        self.label.text = '\n'.join(lines)
+
+    def draw(self):
+        now = self.time()
+        if now - self.last_update >= self.update_interval:
+            self.last_update = now
+            self.update_label()
+
+        frames = self.frames
+        n = len(frames)
+        if n:
+            vertices = self.graph.vertices
+            scale = self.height / self.SCALE
+            offset = len(vertices) // 2 - n
+            for k, dt in enumerate(frames):
+                i = 2 * (offset + k)
+                vertices[i] = self.x + offset + k
+                vertices[i + 1] = self.y + min(dt, self.SCALE) * scale
+            # park the unused points on the oldest sample
+            for k in range(offset):
+                vertices[2 * k] = vertices[2 * offset]
+                vertices[2 * k + 1] = vertices[2 * offset + 1]
+
+        # cocos leaves a perspective projection set up, draw in window
+        # pixels like pyglet's FPSDisplay does
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, self.window.width, 0, self.window.height, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        self.budgets.draw(GL_LINES)
+        if n:
+            self.graph.draw(GL_LINE_STRIP)
+        self.label.draw()
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+
+    def delete(self):
+        self.window.remove_handlers(on_draw=self.on_draw)
+        self.graph.delete()
+        self.budgets.delete()
@@ -0,0 +1,191 @@
+"""
+Profiling captures of the running game.
+
+StackSampler samples the stack of one thread (by default the thread that
+created it, normally the main thread running pyglet) from a background
+thread and counts identical stacks. write_collapsed writes the counts in
+the collapsed stack format read by flamegraph.pl and speedscope, one
+"outer;...;inner count" line per stack.
+
+ProfileCapture runs cProfile together with a StackSampler between start()
+and stop() and writes data/profile-<time>.prof (load it with pstats or
+snakeviz) and data/profile-<time>.collapsed.
+
+SessionSampler is a StackSampler meant to run for a whole session at a
+low rate. It also keeps the stacks of the last second or so, writes them
+to data/hitch-<time>.collapsed when a frame takes longer than a threshold
+and writes the whole session to data/session-<time>.collapsed on close().
+"""
+
+import os
+import sys
+import time
+import cProfile
+import threading
+from collections import deque
+
+def code_name(code):
+    return '%s:%s:%d' % (os.path.basename(code.co_filename), code.co_name, code.co_firstlineno)
+
+def write_collapsed(path, counts):
+    with open(path, 'w') as f:
+        for stack, count in sorted(counts.items()):
+            f.write('%s %d\n' % (stack, count))
+
+class StackSampler(object):
+    """
+    Counts at most max_stacks distinct stacks, further new stacks are
+    counted under OVERFLOW so the table does not grow over long sessions.
+    """
+
+    OVERFLOW = '[other]'
+
+    def __init__(self, interval=.001, thread_id=None, max_stacks=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.current_thread().ident
+        self.max_stacks = max_stacks
+        self.counts = {}
+        self.samples = 0
+        self.names = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='StackSampler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def clear(self):
+        self.counts = {}
+        self.samples = 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return None
+        names = self.names
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            name = names.get(code)
+            if name is None:
+                name = names[code] = code_name(code)
+            stack.append(name)
+            frame = frame.f_back
+        stack.reverse()
+        key = ';'.join(stack)
+        counts = self.counts
+        if key not in counts and self.max_stacks and len(counts) >= self.max_stacks:
+            key = self.OVERFLOW
+        counts[key] = counts.get(key, 0) + 1
+        self.samples += 1
+        return key
+
+    def write_collapsed(self, path):
+        write_collapsed(path, self.counts)
+
+class ProfileCapture(object):
+
+    def __init__(self, directory='data', interval=.001):
+        self.directory = directory
+        self.interval = interval
+        self.profile = None
+        self.sampler = None
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.sampler = StackSampler(self.interval)
+        self.sampler.start()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """Stop the capture and write it out, returns the path without extension."""
+        if not self.running:
+            return None
+        self.profile.disable()
+        self.sampler.stop()
+        if not os.path.exists(self.directory):
+            os.mkdir(self.directory)
+        base = os.path.join(self.directory, 'profile-%d' % int(time.time() * 1000))
+        self.profile.dump_stats(base + '.prof')
+        self.sampler.write_collapsed(base + '.collapsed')
+        self.profile = None
+        self.sampler = None
+        return base
+
+    def toggle(self):
+        if self.running:
+            return self.stop()
+        self.start()
+
+class SessionSampler(StackSampler):
+
+    def __init__(self, window, directory='data', interval=.01, threshold=.1,
+                 recent=1., max_stacks=10000, min_dump_interval=10.):
+        super(SessionSampler, self).__init__(interval, max_stacks=max_stacks)
+        self.window = window
+        self.directory = directory
+        self.threshold = threshold
+        self.min_dump_interval = min_dump_interval
+        self.recent = deque(maxlen=max(1, int(recent / interval)))
+        self.last_frame = None
+        self.last_dump = None
+        self.hitches = 0
+        window.push_handlers(on_draw=self.on_draw)
+
+    def sample(self):
+        key = super(SessionSampler, self).sample()
+        if key is not None:
+            self.recent.append(key)
+        return key
+
+    def path(self, kind):
+        if not os.path.exists(self.directory):
+            os.mkdir(self.directory)
+        return os.path.join(self.directory, '%s-%d.collapsed' % (kind, int(time.time() * 1000)))
+
+    def on_draw(self):
+        now = time.time()
+        if self.last_frame is not None and now - self.last_frame > self.threshold:
+            self.hitches += 1
+            if self.last_dump is None or now - self.last_dump >= self.min_dump_interval:
+                self.last_dump = now
+                counts = {}
+                for key in list(self.recent):
+                    counts[key] = counts.get(key, 0) + 1
+                write_collapsed(self.path('hitch'), counts)
+        self.last_frame = time.time()
+
+    def close(self):
+        """Stop sampling and write the whole session, returns the path."""
+        self.stop()
+        self.window.remove_handlers(on_draw=self.on_draw)
+        if not self.samples:
+            return None
+        path = self.path('session')
+        self.write_collapsed(path)
+        return path
@@ -34,9 +34,25 @@ to reactor.run(), e.g. the following:
 	reactor.run(call_interval=1/20.)
 
 will result in Twisted function calls being dealt with every
-0.05 secs within the Pyglet event loop. If your code results in
-a large number of Twisted calls that need to be processed as
-quickly as possible, decreasing the call_interval will help.
+0.05 secs within the Pyglet event loop. Every time all pending
+calls are made, unless a 'call_budget' in seconds is passed as
+well, in which case calls stop once the budget is used up and the
+rest wait for the next interval:
+
+	reactor.run(call_interval=1/100., call_budget=.004)
+
+The event loop keeps the queue depth and the time calls waited in
+the queue for the most recent calls, see EventLoop.
+
+Alternatively, install(polling=True) installs PygletPollingReactor,
+which runs Twisted in the main thread: the sockets are polled with a
+zero timeout every time the Pyglet event loop is idle, and when Pyglet
+has nothing to do before its next scheduled function the loop waits on
+the sockets (for at most max_wait seconds, so window events are still
+handled promptly) instead of sleeping. Network events are then handled
+without a thread hop and without waiting for the next call_interval.
+
+	reactor.run(max_wait=1/250.)
 
 Based on the wxPython reactor (wxreactor.py) that ships with Twisted.
 
@@ -44,12 +60,21 @@ Padraig Kitterick <p.kitterick@psych.york.ac.uk>
 """
 
 import Queue
+from collections import deque
 
 import pyglet
 
+import tracing
+
 from twisted.python import log, runtime
 from twisted.internet import _threadedselect
 
+try:
+    from twisted.internet.epollreactor import EPollReactor as PollingReactorBase
+except ImportError:
+    # No epoll on this platform
+    from twisted.internet.selectreactor import SelectReactor as PollingReactorBase
+
 try:
     # Pyglet 1.1.2
     from pyglet.app.base import EventLoop
@@ -60,7 +85,14 @@ except ImportError:
 
 class EventLoop(pyglet_event_loop):
 
-    def __init__(self, twisted_queue=None, call_interval=1/100., clock=None):
+    """
+    Makes the queued Twisted calls every call_interval. The queue depth
+    before each drain is kept in depths, the time from enqueue to
+    execution of each call in latencies and the time each drain took in
+    call_times; max_depth and calls are running totals.
+    """
+
+    def __init__(self, twisted_queue=None, call_interval=1/100., clock=None, call_budget=None):
         """Set up extra cruft to integrate Twisted calls."""
 
         pyglet_event_loop.__init__(self)
@@ -72,11 +104,18 @@ class EventLoop(pyglet_event_loop):
             self.clock = pyglet.clock.get_default()
 
         if not twisted_queue is None:
-            self.register_twisted_queue(twisted_queue, call_interval)        
+            self.register_twisted_queue(twisted_queue, call_interval, call_budget)
 
-    def register_twisted_queue(self, twisted_queue, call_interval):
-        # The queue containing Twisted function references to call
+    def register_twisted_queue(self, twisted_queue, call_interval, call_budget=None):
+        # The queue containing (enqueue time, Twisted function) pairs to call
         self._twisted_call_queue = twisted_queue
+        self.call_budget = call_budget
+        # Time spent making Twisted calls, for the frame time overlay
+        self.call_times = deque(maxlen=1000)
+        self.depths = deque(maxlen=1000)
+        self.latencies = deque(maxlen=1000)
+        self.max_depth = 0
+        self.calls = 0
         
         # Schedule a method to deal with Twisted calls
         self.clock.schedule_interval_soft(self._make_twisted_calls, call_interval)
@@ -84,12 +123,111 @@ class EventLoop(pyglet_event_loop):
     def _make_twisted_calls(self, dt):
         """Check if we need to make function calls for Twisted."""
         
-        try:
-            # Deal with the next function call in the queue
-            f = self._twisted_call_queue.get(False)
+        t = self.clock.time()
+        queue = self._twisted_call_queue
+        depth = queue.qsize()
+        self.depths.append(depth)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        deadline = t + self.call_budget if self.call_budget is not None else None
+        # Calls queued while draining wait for the next interval
+        for _ in range(depth):
+            try:
+                queued, f = queue.get(False)
+            except Queue.Empty:
+                break
+            begin = tracing.clock()
+            self.latencies.append(begin - queued)
+            self.calls += 1
             f()
-        except Queue.Empty:
-            pass
+            tracing.record('reactor call', begin)
+            if deadline is not None and self.clock.time() >= deadline:
+                break
+        self.call_times.append(self.clock.time() - t)
+
+class PollingEventLoop(pyglet_event_loop):
+    """
+    Polls the sockets of a PygletPollingReactor from the Pyglet idle
+    step. The time spent polling and handling network events each time
+    is kept in call_times.
+    """
+
+    def __init__(self, reactor=None, max_wait=1/250., clock=None):
+        pyglet_event_loop.__init__(self)
+
+        if clock:
+            self.clock = clock
+        elif not hasattr(self, "clock"):
+            # This is not defined in Pyglet 1.1
+            self.clock = pyglet.clock.get_default()
+
+        if not reactor is None:
+            self.register_reactor(reactor, max_wait)
+
+    def register_reactor(self, reactor, max_wait):
+        self._reactor = reactor
+        self.max_wait = max_wait
+        self.call_times = deque(maxlen=1000)
+
+    def _poll(self, timeout):
+        t = self.clock.time()
+        begin = tracing.clock()
+        self._reactor.runUntilCurrent()
+        self._reactor.doIteration(timeout)
+        self._reactor.runUntilCurrent()
+        tracing.record('reactor poll', begin)
+        self.call_times.append(self.clock.time() - t)
+
+    def idle(self):
+        self._poll(0)
+        timeout = pyglet_event_loop.idle(self)
+        # Wait on the sockets rather than sleeping, but come back to
+        # Pyglet in time for the next scheduled function or window event.
+        wait = self.max_wait
+        if timeout is not None:
+            wait = min(wait, timeout)
+        delay = self._reactor.timeout()
+        if delay is not None:
+            wait = min(wait, delay)
+        if wait > 0:
+            self._poll(wait)
+        return 0
+
+class PygletPollingReactor(PollingReactorBase):
+    """
+    Pyglet reactor without a Twisted thread.
+
+    The reactor is driven from PollingEventLoop.idle in the main thread.
+    """
+
+    def registerPygletEventLoop(self, eventloop):
+        self.pygletEventLoop = eventloop
+
+    def _stopPyglet(self):
+        """Stop the pyglet event loop."""
+
+        if hasattr(self, "pygletEventLoop"):
+            self.pygletEventLoop.exit()
+
+    def run(self, installSignalHandlers=True, max_wait=1/250.):
+        """Start the Pyglet event loop and Twisted reactor."""
+
+        self.startRunning(installSignalHandlers=installSignalHandlers)
+
+        if not hasattr(self, "pygletEventLoop"):
+            self.registerPygletEventLoop(PollingEventLoop(self, max_wait))
+        else:
+            self.pygletEventLoop.register_reactor(self, max_wait)
+
+        self.addSystemEventTrigger("after", "shutdown", self._stopPyglet)
+
+        self.pygletEventLoop.run()
+        del self.pygletEventLoop
+
+        # If Pyglet exited on its own, shut Twisted down in the usual way.
+        if not self._stopped:
+            self.stop()
+        self.mainLoop()
 
 class PygletReactor(_threadedselect.ThreadedSelectReactor):
     """
@@ -121,7 +259,8 @@ class PygletReactor(_threadedselect.ThreadedSelectReactor):
         if hasattr(self, "pygletEventLoop"):
             # Add the function to a queue which is called as part
             # of the Pyglet event loop (see EventLoop above)
-            self._twistedQueue.put(f)
+            tracing.instant('reactor enqueue')
+            self._twistedQueue.put((tracing.clock(), f))
         else:
             # If Pyglet has stopped, add the events to a queue which
             # is processed prior to shutting Twisted down.
@@ -133,7 +272,7 @@ class PygletReactor(_threadedselect.ThreadedSelectReactor):
         if hasattr(self, "pygletEventLoop"):
             self.pygletEventLoop.exit()
 
-    def run(self, call_interval=1/100., installSignalHandlers=True):
+    def run(self, call_interval=1/100., installSignalHandlers=True, call_budget=None):
         """Start the Pyglet event loop and Twisted reactor."""
 
         # Create a queue to hold Twisted events that will be executed
@@ -143,9 +282,11 @@ class PygletReactor(_threadedselect.ThreadedSelectReactor):
 
         if not hasattr(self, "pygletEventLoop"):
             log.msg("No Pyglet event loop registered. Using the default.")
-            self.registerPygletEventLoop(EventLoop(self._twistedQueue, call_interval))
+            self.registerPygletEventLoop(EventLoop(self._twistedQueue, call_interval,
+                                                   call_budget=call_budget))
         else:
-            self.pygletEventLoop.register_twisted_queue(self._twistedQueue, call_interval)
+            self.pygletEventLoop.register_twisted_queue(self._twistedQueue, call_interval,
+                                                        call_budget)
         
         # Start the Twisted thread.
         self.interleave(self._runInMainThread,
@@ -181,11 +322,12 @@ class PygletReactor(_threadedselect.ThreadedSelectReactor):
                     except:
                         log.err()
         
-def install():
+def install(polling=False):
     """
     Setup Twisted+Pyglet integration based on the Pyglet event loop.
+    With polling, Twisted runs in the main thread (PygletPollingReactor).
     """
-    reactor = PygletReactor()
+    reactor = PygletPollingReactor() if polling else PygletReactor()
     from twisted.internet.main import installReactor
     installReactor(reactor)
     return reactor
@@ -0,0 +1,72 @@
+"""
+Record and replay Snake games.
+
+A game is stored as one JSON line holding the board size, speed factor,
+seed and the (tick, direction) turns of the player. Replaying feeds the
+turns back into a SnakeEngine seeded the same way, which rebuilds the
+game exactly without any rendering. Games that were left before they
+ended are marked with finished false and replay up to their last tick.
+
+    python replay.py data/Snake_<timestamp>.replay
+"""
+
+import sys
+import json
+
+from engine import SnakeEngine
+
+def game_record(engine, **extra):
+    record = {'board_size': engine.ncells,
+              'speed_factor': engine.speed_factor,
+              'seed': engine.seed,
+              'moves': [list(m) for m in engine.moves],
+              'ticks': engine.ticks,
+              'score': engine.score,
+              'food_eaten': engine.food_eaten}
+    record.update(extra)
+    return record
+
+def write_game(path, engine, **extra):
+    with open(path, 'a') as f:
+        f.write(json.dumps(game_record(engine, **extra), separators=(',', ':')))
+        f.write('\n')
+
+def read_games(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def replay(record, engine=None):
+    """Replay a recorded game and return the engine in its final state."""
+    if engine is None:
+        engine = SnakeEngine(record['board_size'], record['speed_factor'])
+    engine.reset(record['seed'])
+    moves = record['moves']
+    finished = record.get('finished', True)
+    n = 0
+    while not engine.game_over and (finished or engine.ticks < record['ticks']):
+        while n < len(moves) and moves[n][0] == engine.ticks:
+            engine.turn(moves[n][1])
+            n += 1
+        engine.step()
+    return engine
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    ok = True
+    for path in argv:
+        engine = None
+        for i, record in enumerate(read_games(path)):
+            if engine is None or engine.ncells != record['board_size']:
+                engine = SnakeEngine(record['board_size'], record['speed_factor'])
+            engine.speed_factor = record['speed_factor']
+            replay(record, engine)
+            match = engine.score == record['score'] and engine.ticks == record['ticks']
+            ok = ok and match
+            print('%s %d score=%d food=%d ticks=%d %s' % (path, i, engine.score, engine.food_eaten,
+                                                         engine.ticks, 'ok' if match else 'MISMATCH'))
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""
+Compact game state for checkpointing and lookahead search.
+
+SnakeState holds the occupied cells as one Python int (bit i is the flat
+cell index (row - 1) * ncells + (column - 1)), the body order as a ring
+buffer of cell indices with head and length, the free cell index of
+SnakeEngine, plus food, direction, score, timing and the food RNG. A
+state can be stepped on its own with the SnakeEngine rules, and since it
+keeps the free cells in the engine's order it places food exactly like
+the engine, so a restored game continues the way the original would.
+
+The ring is sized to the snake and doubles when it fills. The free cell
+index is shared between copies: free and free_pos are never written once
+a state has them, the cells that moved since are kept in two dicts, and
+when those grow past COMPACT entries they are folded into new arrays. A
+copy therefore costs time in the length of the snake rather than the
+area of the board, and the RNG is copied on its first draw.
+
+dumps only lists the free cells that are not at their own index, which
+after a reset are the few cells the game has moved so far.
+"""
+
+import json
+import math
+from array import array
+from random import Random
+
+from engine import SnakeEngine, MOVES
+
+def ring_array(n, size):
+    return array('H' if n * n < 2 ** 16 else 'I', [0]) * size
+
+class SnakeState(object):
+
+    __slots__ = ('ncells', 'bits', 'ring', 'head', 'length', 'free', 'free_pos', 'nfree',
+                 'free_moved', 'pos_moved', 'food', 'direction', 'score', 'food_eaten',
+                 'ticks', 'speed', 'speed_factor', 'elapsed', 'game_over', 'rng', 'rng_shared')
+
+    # moved free cells kept before they are folded into new arrays
+    COMPACT = 1024
+
+    @classmethod
+    def from_engine(cls, engine):
+        n = engine.ncells
+        state = cls()
+        state.ncells = n
+        state.ring = ring_array(n, max(16, 2 * len(engine.snake)))
+        bits = 0
+        # the ring runs from the tail at slot 0 to the head
+        for k, (c, r) in enumerate(reversed(engine.snake)):
+            i = (r - 1) * n + (c - 1)
+            state.ring[k] = i
+            bits |= 1 << i
+        state.bits = bits
+        state.length = len(engine.snake)
+        state.head = state.length - 1
+        state.free = array('i', engine.free)
+        state.free_pos = array('i', engine.free_pos)
+        state.nfree = len(engine.free)
+        state.free_moved = {}
+        state.pos_moved = {}
+        state.food = engine.index(*engine.food) if engine.food else -1
+        state.direction = engine.direction
+        state.score = engine.score
+        state.food_eaten = engine.food_eaten
+        state.ticks = engine.ticks
+        state.speed = engine.speed
+        state.speed_factor = engine.speed_factor
+        state.elapsed = engine.elapsed
+        state.game_over = engine.game_over
+        state.rng = Random()
+        state.rng.setstate(engine.rng.getstate())
+        state.rng_shared = False
+        return state
+
+    def restore(self, engine):
+        """Load this state into engine, replacing its body and free cell index."""
+        n = self.ncells
+        if engine.ncells != n:
+            raise ValueError("state is for a %dx%d board" % (n, n))
+        grid = engine.grid
+        for c, r in engine.snake:
+            grid[(r - 1) * n + (c - 1)] = 0
+        engine.snake.clear()
+        for i in self.cells():
+            r, c = divmod(i, n)
+            engine.snake.append((c + 1, r + 1))
+            grid[i] = 1
+        self.compact()
+        engine.free[:] = self.free
+        engine.free_pos[:] = self.free_pos
+        if self.food >= 0:
+            r, c = divmod(self.food, n)
+            engine.food = (c + 1, r + 1)
+        else:
+            engine.food = None
+        engine.direction = self.direction
+        engine.score = self.score
+        engine.food_eaten = self.food_eaten
+        engine.ticks = self.ticks
+        engine.speed = self.speed
+        engine.speed_factor = self.speed_factor
+        engine.elapsed = self.elapsed
+        engine.game_over = self.game_over
+        engine.rng.setstate(self.rng.getstate())
+        return engine
+
+    def copy(self):
+        state = SnakeState()
+        for name in self.__slots__:
+            setattr(state, name, getattr(self, name))
+        state.ring = self.ring[:]
+        state.free_moved = self.free_moved.copy()
+        state.pos_moved = self.pos_moved.copy()
+        # whichever state draws food first takes its own copy of the RNG
+        self.rng_shared = state.rng_shared = True
+        return state
+
+    def cells(self):
+        """Body cell indices from the head to the tail."""
+        size = len(self.ring)
+        return [self.ring[(self.head - k) % size] for k in range(self.length)]
+
+    def free_cells(self):
+        """The free cell index in the order of SnakeEngine.free."""
+        self.compact()
+        return self.free
+
+    def key(self):
+        return (self.bits, self.ring[self.head], self.food, self.direction, self.length)
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __eq__(self, other):
+        return (isinstance(other, SnakeState) and self.key() == other.key()
+                and self.cells() == other.cells())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def safe_moves(self):
+        """Directions that do not end the game on the next tick."""
+        n = self.ncells
+        r, c = divmod(self.ring[self.head], n)
+        tail = self.ring[(self.head - self.length + 1) % len(self.ring)]
+        moves = []
+        for d, (dc, dr) in MOVES.items():
+            if d != self.direction and (d + self.direction) % 2 == 0:
+                continue
+            nc, nr = c + dc, r + dr
+            if nc < 0 or nc >= n or nr < 0 or nr >= n:
+                continue
+            i = nr * n + nc
+            if (self.bits >> i) & 1 and i != tail:
+                continue
+            moves.append(d)
+        return moves
+
+    def free_at(self, k):
+        i = self.free_moved.get(k)
+        return self.free[k] if i is None else i
+
+    def compact(self):
+        """Fold the moved free cells into new free and free_pos arrays."""
+        if not self.free_moved and len(self.free) == self.nfree:
+            return
+        nfree = self.nfree
+        free = self.free[:nfree]
+        if len(free) < nfree:
+            free.extend(array('i', [0]) * (nfree - len(free)))
+        for k, i in self.free_moved.items():
+            if k < nfree:
+                free[k] = i
+        free_pos = self.free_pos[:]
+        # stale positions of occupied cells are never read
+        for i, k in self.pos_moved.items():
+            free_pos[i] = k
+        self.free = free
+        self.free_pos = free_pos
+        self.free_moved = {}
+        self.pos_moved = {}
+
+    def occupy(self, i):
+        self.bits |= 1 << i
+        # the same swap with the last free cell as SnakeEngine.occupy
+        pos = self.pos_moved.get(i)
+        if pos is None:
+            pos = self.free_pos[i]
+        self.nfree -= 1
+        last = self.free_at(self.nfree)
+        if last != i:
+            self.free_moved[pos] = last
+            self.pos_moved[last] = pos
+            if len(self.free_moved) > self.COMPACT:
+                self.compact()
+
+    def release(self, i):
+        self.bits &= ~(1 << i)
+        self.pos_moved[i] = self.nfree
+        self.free_moved[self.nfree] = i
+        self.nfree += 1
+
+    def grow(self):
+        """Double the ring, keeping the body from the tail at slot 0."""
+        cells = self.cells()
+        ring = ring_array(self.ncells, 2 * len(self.ring))
+        for k, i in enumerate(reversed(cells)):
+            ring[k] = i
+        self.ring = ring
+        self.head = self.length - 1
+
+    def step(self, direction=0):
+        """Turn (if the turn is legal) and advance one tick, like SnakeEngine."""
+        if direction and (self.direction + direction) % 2 == 1:
+            self.direction = direction
+        n = self.ncells
+        dc, dr = MOVES[self.direction]
+        r, c = divmod(self.ring[self.head], n)
+        nc = c + dc
+        nr = r + dr
+        self.ticks += 1
+        self.elapsed += self.speed
+
+        if nc < 0 or nc >= n or nr < 0 or nr >= n:
+            self.game_over = True
+            return SnakeEngine.HIT_WALL
+        i = nr * n + nc
+
+        if i == self.food:
+            self.food_eaten += 1
+            self.score += int(math.ceil((self.food_eaten - 1) * 1.5 + 10))
+            if self.length == len(self.ring):
+                self.grow()
+            self.head = (self.head + 1) % len(self.ring)
+            self.ring[self.head] = i
+            self.length += 1
+            self.occupy(i)
+            self.speed = self.speed * self.speed_factor
+            if self.spawn_food() < 0:
+                self.game_over = True
+                return SnakeEngine.BOARD_FULL
+            return SnakeEngine.ATE
+
+        # the tail retracts before the head advances, as in SnakeEngine
+        size = len(self.ring)
+        self.release(self.ring[(self.head - self.length + 1) % size])
+        self.length -= 1
+        if (self.bits >> i) & 1:
+            self.game_over = True
+            return SnakeEngine.HIT_SELF
+        self.head = (self.head + 1) % size
+        self.ring[self.head] = i
+        self.length += 1
+        self.occupy(i)
+        return SnakeEngine.MOVED
+
+    def spawn_food(self):
+        if not self.nfree:
+            self.food = -1
+            return -1
+        if self.rng_shared:
+            rng = Random()
+            rng.setstate(self.rng.getstate())
+            self.rng = rng
+            self.rng_shared = False
+        self.food = self.free_at(int(self.rng.random() * self.nfree))
+        return self.food
+
+    def dumps(self):
+        """Serialize to a JSON string; the body is listed from the head."""
+        free = self.free_cells()
+        version, internal, gauss = self.rng.getstate()
+        return json.dumps({'ncells': self.ncells, 'bits': '%x' % self.bits,
+                           'body': self.cells(), 'nfree': self.nfree,
+                           'free': [[k, i] for k, i in enumerate(free) if k != i],
+                           'food': self.food, 'direction': self.direction,
+                           'score': self.score, 'food_eaten': self.food_eaten,
+                           'ticks': self.ticks, 'speed': self.speed,
+                           'speed_factor': self.speed_factor, 'elapsed': self.elapsed,
+                           'game_over': self.game_over,
+                           'rng': [version, list(internal), gauss]},
+                          separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, s):
+        d = json.loads(s)
+        n = d['ncells']
+        state = cls()
+        state.ncells = n
+        state.bits = int(d['bits'], 16)
+        body = d['body']
+        state.ring = ring_array(n, max(16, 2 * len(body)))
+        for k, i in enumerate(reversed(body)):
+            state.ring[k] = i
+        state.length = len(body)
+        state.head = state.length - 1
+        state.nfree = d['nfree']
+        state.free = array('i', range(state.nfree))
+        # only the positions of free cells are ever read
+        state.free_pos = array('i', range(n * n))
+        for k, i in d['free']:
+            state.free[k] = i
+            state.free_pos[i] = k
+        state.free_moved = {}
+        state.pos_moved = {}
+        for name in ('food', 'direction', 'score', 'food_eaten', 'ticks', 'speed',
+                     'speed_factor', 'elapsed', 'game_over'):
+            setattr(state, name, d[name])
+        version, internal, gauss = d['rng']
+        state.rng = Random()
+        state.rng.setstate((version, tuple(internal), gauss))
+        state.rng_shared = False
+        return state
@@ -0,0 +1,131 @@
+"""
+Difficulty curves over board size and speed factor.
+
+A reference agent plays seeded headless games in every board size x
+speed factor condition. It plans a path once per reaction time and makes
+at most one turn per motor time, both in seconds of game time (see
+controllers.ReactionController), so faster games leave it more cells
+between turns until it can no longer reach the food. Conditions are
+spread over a process pool and every finished condition is appended to a
+cache file, so a rerun only plays the conditions that are new.
+
+    python -m snake.sweep --controller path --reaction .2 --motor .1 --games 200
+
+The curves are written as CSV with the expected score, ticks and seconds
+survived per condition, and the number of games cut off at --max-ticks.
+"""
+
+import os
+import sys
+import csv
+import json
+import argparse
+import multiprocessing
+from random import Random
+
+from engine import BOARD_SIZES, SPEED_FACTORS
+from controllers import ReactionController
+from tournament import load_controller, play_game
+
+FIELDS = ['board_size', 'speed_factor', 'games', 'score', 'score_sd',
+          'food_eaten', 'ticks', 'seconds', 'timeouts']
+
+def cache_key(spec, reaction, motor, games, seed, max_ticks, board_size, speed_factor):
+    return '%s|%r|%r|%d|%d|%r|%d|%.3f' % (spec, reaction, motor, games, seed, max_ticks,
+                                           board_size, speed_factor)
+
+def load_cache(path):
+    cache = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    cache[entry['key']] = entry
+    return cache
+
+def run_condition(job):
+    key, spec, reaction, motor, games, seed, max_ticks, board_size, speed_factor = job
+    base = load_controller(spec)
+    # the seeds only depend on the seed and the board size, so every speed
+    # factor sees the same food sequences
+    seeds = Random(seed * 1000 + board_size)
+    scores = []
+    food = ticks = seconds = timeouts = 0
+    for _ in range(games):
+        engine, _ = play_game(ReactionController(base, reaction, motor), board_size,
+                              speed_factor, seeds.getrandbits(32), max_ticks)
+        scores.append(engine.score)
+        food += engine.food_eaten
+        ticks += engine.ticks
+        seconds += engine.elapsed
+        timeouts += not engine.game_over
+    mean = sum(scores) / float(games)
+    sd = (sum((s - mean) ** 2 for s in scores) / float(max(games - 1, 1))) ** .5
+    return {'key': key, 'board_size': board_size, 'speed_factor': speed_factor,
+            'games': games, 'score': mean, 'score_sd': sd,
+            'food_eaten': food / float(games), 'ticks': ticks / float(games),
+            'seconds': seconds / float(games), 'timeouts': timeouts}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep difficulty over board size and speed factor.')
+    parser.add_argument('--controller', default='path')
+    parser.add_argument('--reaction', type=float, default=.2, help='seconds per decision')
+    parser.add_argument('--motor', type=float, default=.1, help='seconds per turn')
+    parser.add_argument('--board-sizes', type=int, nargs='+', default=BOARD_SIZES)
+    parser.add_argument('--speed-factors', type=float, nargs='+', default=SPEED_FACTORS)
+    parser.add_argument('--games', type=int, default=100, help='games per condition')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-ticks', type=int, default=100000,
+                        help='games still running after this many ticks count as timeouts')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--cache', default='data/sweep_cache.jsonl')
+    parser.add_argument('-o', '--output', default='data/sweep.csv')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    load_controller(args.controller)
+    for path in (args.cache, args.output):
+        d = os.path.dirname(path)
+        if d and not os.path.exists(d): os.makedirs(d)
+
+    cache = load_cache(args.cache)
+    conditions = []
+    todo = []
+    for board_size in args.board_sizes:
+        for speed_factor in args.speed_factors:
+            key = cache_key(args.controller, args.reaction, args.motor, args.games, args.seed,
+                            args.max_ticks, board_size, speed_factor)
+            conditions.append(key)
+            if key not in cache:
+                todo.append((key, args.controller, args.reaction, args.motor, args.games,
+                             args.seed, args.max_ticks, board_size, speed_factor))
+
+    print('%d conditions, %d cached, %d to run' % (len(conditions), len(conditions) - len(todo), len(todo)))
+    if todo:
+        pool = multiprocessing.Pool(args.processes)
+        try:
+            with open(args.cache, 'a') as f:
+                for entry in pool.imap_unordered(run_condition, todo):
+                    cache[entry['key']] = entry
+                    f.write(json.dumps(entry) + '\n')
+                    f.flush()
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    with open(args.output, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for key in conditions:
+            writer.writerow([cache[key][field] for field in FIELDS])
+    print('difficulty curves written to %s' % args.output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
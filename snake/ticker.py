@@ -0,0 +1,92 @@
+from collections import deque
+
+import pyglet
+
+class TickScheduler(object):
+    """
+    Calls callback(dt) on a fixed timestep measured against absolute
+    deadlines. Every deadline is the previous deadline plus interval, so the
+    time spent in the callback and the granularity of the clock do not add
+    up over a trial.
+
+    When a tick runs late the next one is scheduled right away to catch up.
+    If the schedule falls more than max_lag ticks behind, the missed ticks
+    are counted as dropped and the deadline is moved up to the current time.
+
+    The target and actual time of recent ticks are kept in history and the
+    time spent in the callback in callback_times.
+
+    pyglet's schedule_once counts the delay from the time of the current
+    frame rather than from now, so delays are computed against that time
+    and a tick that still fires before its deadline is put off again.
+    """
+
+    def __init__(self, callback, interval, clock=None, max_lag=3, history=1000):
+        self.callback = callback
+        self.interval = interval
+        self.clock = clock or pyglet.clock.get_default()
+        self.time = self.clock.time
+        self.max_lag = max_lag
+
+        self.history = deque(maxlen=history)
+        self.callback_times = deque(maxlen=history)
+        self.running = False
+        self.deadline = None
+        self.last_actual = None
+        self.ticks = 0
+        self.overruns = 0
+        self.dropped = 0
+
+    def start(self, delay=None):
+        """Start ticking, the first tick is due after delay (default interval)."""
+        self.stop()
+        self.running = True
+        now = self.time()
+        self.deadline = now + (self.interval if delay is None else delay)
+        # the first dt is measured from the start
+        self.last_actual = now
+        self.ticks = 0
+        self.overruns = 0
+        self.dropped = 0
+        self.history.clear()
+        self.callback_times.clear()
+        self._schedule(now)
+
+    def stop(self):
+        if self.running:
+            self.clock.unschedule(self._tick)
+        self.running = False
+
+    def _schedule(self, now):
+        # the same base time schedule_once uses, it falls back to now when
+        # the last frame is long past
+        base = getattr(self.clock, 'last_ts', None)
+        if base is None or now - base > .2 or base > now:
+            base = now
+        self.clock.schedule_once(self._tick, max(0, self.deadline - base))
+
+    def _tick(self, _):
+        now = self.time()
+        if now < self.deadline:
+            self._schedule(now)
+            return
+        dt = now - self.last_actual
+        self.history.append((self.deadline, now))
+        self.last_actual = now
+        self.ticks += 1
+
+        self.callback(dt)
+        self.callback_times.append(self.time() - now)
+        if not self.running:
+            return
+
+        self.deadline += self.interval
+        now = self.time()
+        if now > self.deadline:
+            self.overruns += 1
+            behind = int((now - self.deadline) / self.interval)
+            if behind > self.max_lag:
+                self.dropped += behind
+                self.deadline += behind * self.interval
+        self._schedule(now)
+
@@ -0,0 +1,111 @@
+"""
+Run seeded headless games of automated controllers across a process pool.
+
+    python -m snake.tournament greedy random mymodule:my_controller \\
+        --board-sizes 11 31 49 --speed-factors 0.99 --games 1000
+
+Controllers are names from controllers.CONTROLLERS or module:attribute
+paths. Every controller plays the same seeds, and one CSV line per game
+is streamed to the output file as results come in.
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import importlib
+import multiprocessing
+from random import Random
+
+from engine import SnakeEngine, BOARD_SIZES
+from controllers import CONTROLLERS
+
+DEATHS = {SnakeEngine.HIT_WALL: 'wall',
+          SnakeEngine.HIT_SELF: 'self',
+          SnakeEngine.BOARD_FULL: 'full'}
+
+FIELDS = ['controller', 'board_size', 'speed_factor', 'seed',
+          'score', 'food_eaten', 'ticks', 'death']
+
+def load_controller(spec):
+    if spec in CONTROLLERS:
+        return CONTROLLERS[spec]
+    module, _, attr = spec.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+def play_game(controller, board_size, speed_factor, seed, max_ticks=None):
+    """Play one game, returns the final engine and the result of the last tick."""
+    engine = SnakeEngine(board_size, speed_factor)
+    engine.reset(seed)
+    if isinstance(controller, type):
+        controller = controller()
+    result = None
+    while not engine.game_over:
+        if max_ticks is not None and engine.ticks >= max_ticks:
+            break
+        direction = controller(engine)
+        if direction:
+            engine.turn(direction)
+        result = engine.step()
+    return engine, result
+
+def _run(job):
+    spec, board_size, speed_factor, seed, max_ticks = job
+    engine, result = play_game(load_controller(spec), board_size, speed_factor, seed, max_ticks)
+    death = DEATHS.get(result, 'timeout')
+    return [spec, board_size, speed_factor, seed,
+            engine.score, engine.food_eaten, engine.ticks, death]
+
+def jobs(controllers, board_sizes, speed_factors, games, seed, max_ticks):
+    seeds = Random(seed)
+    for board_size in board_sizes:
+        for speed_factor in speed_factors:
+            for _ in range(games):
+                game_seed = seeds.getrandbits(32)
+                for spec in controllers:
+                    yield (spec, board_size, speed_factor, game_seed, max_ticks)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run a tournament of Snake controllers.')
+    parser.add_argument('controllers', nargs='+')
+    parser.add_argument('--board-sizes', type=int, nargs='+', default=BOARD_SIZES)
+    parser.add_argument('--speed-factors', type=float, nargs='+', default=[.99])
+    parser.add_argument('--games', type=int, default=100, help='games per condition')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-ticks', type=int, default=None)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('-o', '--output', default=None)
+    args = parser.parse_args(argv)
+
+    for spec in args.controllers:
+        load_controller(spec)
+
+    output = args.output
+    if output is None:
+        if not os.path.exists("data"): os.mkdir("data")
+        output = "data/Tournament_%s.csv" % time.strftime("%Y-%m-%d_%H-%M-%S")
+
+    pool = multiprocessing.Pool(args.processes)
+    n = 0
+    try:
+        with open(output, 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for row in pool.imap_unordered(_run, jobs(args.controllers, args.board_sizes,
+                                                      args.speed_factors, args.games,
+                                                      args.seed, args.max_ticks),
+                                           chunksize=16):
+                writer.writerow(row)
+                n += 1
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    print('%d games written to %s' % (n, output))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
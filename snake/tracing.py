@@ -0,0 +1,139 @@
+"""
+Opt-in timeline tracing in the Chrome trace event format.
+
+Spans are recorded into a preallocated ring buffer, so a long session
+keeps its most recent events without allocating per event, and export()
+writes them as JSON that chrome://tracing and Perfetto load. Events carry
+the id of the thread that recorded them, which shows how the Twisted
+thread, reactor calls, ticks and drawing interleave.
+
+Nothing is recorded until enable() is called; while disabled a traced
+function costs one extra call and a global lookup.
+"""
+
+import json
+import functools
+import threading
+from array import array
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from timeit import default_timer as clock
+
+try:
+    from thread import get_ident
+except ImportError:
+    from threading import get_ident
+
+class Tracer(object):
+
+    def __init__(self, size=1 << 17):
+        self.size = size
+        self.names = [None] * size
+        self.begins = array('d', [0.]) * size
+        # instant events have no end and are stored with an end of -1
+        self.ends = array('d', [0.]) * size
+        self.tids = array('L', [0]) * size
+        self.count = 0
+        self.threads = {}
+        self.origin = clock()
+        # the Twisted thread records events too
+        self.lock = threading.Lock()
+
+    def record(self, name, begin, end):
+        tid = get_ident()
+        with self.lock:
+            i = self.count % self.size
+            self.count += 1
+            if tid not in self.threads:
+                self.threads[tid] = threading.current_thread().name
+            self.names[i] = name
+            self.begins[i] = begin
+            self.ends[i] = end
+            self.tids[i] = tid
+
+    def events(self):
+        """Recorded events, oldest first, as Chrome trace event dicts."""
+        with self.lock:
+            return self._events()
+
+    def _events(self):
+        tids = dict((tid, k + 1) for k, tid in enumerate(sorted(self.threads)))
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tids[tid],
+                   'args': {'name': name}} for tid, name in self.threads.items()]
+        first = max(0, self.count - self.size)
+        for k in range(first, self.count):
+            i = k % self.size
+            tid = self.tids[i]
+            begin = (self.begins[i] - self.origin) * 1e6
+            if self.ends[i] < 0:
+                events.append({'name': self.names[i], 'ph': 'i', 's': 't', 'ts': begin,
+                               'pid': 1, 'tid': tids.get(tid, 0)})
+            else:
+                events.append({'name': self.names[i], 'ph': 'X', 'ts': begin,
+                               'dur': (self.ends[i] - self.begins[i]) * 1e6,
+                               'pid': 1, 'tid': tids.get(tid, 0)})
+        return events
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, f)
+
+tracer = None
+active = False
+
+def enable(size=1 << 17):
+    global tracer, active
+    if tracer is None:
+        tracer = Tracer(size)
+    active = True
+
+def disable():
+    global active
+    active = False
+
+def record(name, begin, end=None):
+    """Record a span from begin (a clock() value) to end or now."""
+    if active:
+        tracer.record(name, begin, clock() if end is None else end)
+
+def instant(name):
+    if active:
+        tracer.record(name, clock(), -1.)
+
+def traced(name):
+    """Decorator that records every call of the function as a span."""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if not active:
+                return f(*args, **kwargs)
+            begin = clock()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                tracer.record(name, begin, clock())
+        return wrapper
+    return decorator
+
+def trace_window(window):
+    """Record the on_draw handlers and the buffer flip of window."""
+    dispatch_event = window.dispatch_event
+    def traced_dispatch_event(event_type, *args):
+        if not active or event_type != 'on_draw':
+            return dispatch_event(event_type, *args)
+        begin = clock()
+        try:
+            return dispatch_event(event_type, *args)
+        finally:
+            tracer.record('draw', begin, clock())
+    window.dispatch_event = traced_dispatch_event
+    window.flip = traced('flip')(window.flip)
+
+def export(path):
+    """Write the recorded events to path, returns False if there were none."""
+    if tracer is None or not tracer.count:
+        return False
+    tracer.export(path)
+    return True
@@ -0,0 +1,46 @@
+from random import Random
+
+from engine import SnakeEngine
+from autopilot import Autopilot
+
+def rebuilt(engine):
+    autopilot = Autopilot()
+    autopilot.rebuild(engine)
+    return autopilot.dist
+
+def play(autopilot, ncells, seed, skip=0., ticks=2000):
+    """Play a game, calling the autopilot on a random 1 - skip of the ticks."""
+    rng = Random(seed)
+    engine = SnakeEngine(ncells)
+    engine.reset(seed)
+    checked = 0
+    while not engine.game_over and engine.ticks < ticks:
+        if rng.random() >= skip:
+            direction = autopilot(engine)
+            if autopilot.queue is None:
+                assert autopilot.dist == rebuilt(engine), 'tick %d' % engine.ticks
+                checked += 1
+            if direction:
+                engine.turn(direction)
+        engine.step()
+    return engine, checked
+
+def test_incremental_matches_rebuild():
+    for seed in range(5):
+        engine, checked = play(Autopilot(), 15, seed)
+        assert checked > 100
+        assert engine.food_eaten > 10
+
+def test_skipped_ticks_match_rebuild():
+    total = 0
+    for seed in range(10):
+        engine, checked = play(Autopilot(), 15, seed, skip=.5)
+        total += checked
+    assert total > 200
+
+def test_budgeted_rebuild_matches_rebuild():
+    total = 0
+    for seed in range(10):
+        engine, checked = play(Autopilot(budget=40), 21, seed)
+        total += checked
+    assert total > 500
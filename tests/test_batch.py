@@ -0,0 +1,45 @@
+from random import Random
+
+import numpy as np
+
+from engine import SnakeEngine
+from batch import BatchEngine
+from controllers import greedy_controller
+
+def test_batch_steps_like_engine():
+    nboards, ncells = 16, 9
+    batch = BatchEngine(nboards, ncells, speed_factor=.95, seed=0)
+    batch.reset()
+    engines = []
+    for b in range(nboards):
+        engine = SnakeEngine(ncells, speed_factor=.95)
+        engine.reset(b)
+        # the batch draws its own food, give it the food of the engine
+        batch.food[b] = engine.index(*engine.food)
+        engines.append(engine)
+
+    rng = Random(0)
+    while any(not engine.game_over for engine in engines):
+        actions = np.zeros(nboards, dtype=np.int8)
+        for b, engine in enumerate(engines):
+            if engine.game_over:
+                continue
+            # mostly greedy, sometimes a random turn, reversal or no turn
+            d = greedy_controller(engine) if rng.random() < .8 else rng.randint(0, 4)
+            actions[b] = d
+            if d:
+                engine.turn(d)
+        results = batch.step(actions)
+        for b, engine in enumerate(engines):
+            if engine.game_over:
+                assert not batch.alive[b]
+                continue
+            result = engine.step()
+            assert results[b] == result
+            assert batch.alive[b] == (not engine.game_over)
+            assert (batch.score[b], batch.food_eaten[b], batch.speed[b]) == \
+                (engine.score, engine.food_eaten, engine.speed)
+            assert bytearray(batch.grid[b].tobytes()) == engine.grid
+            if result == SnakeEngine.ATE:
+                batch.food[b] = engine.index(*engine.food)
+    assert sum(engine.food_eaten for engine in engines) > 0
@@ -0,0 +1,45 @@
+import time
+from array import array
+
+import mcts
+from engine import SnakeEngine
+from mcts import MCTSPlayer
+from controllers import greedy_controller
+
+def flatten(moves):
+    flat = array('i')
+    for tick, direction in moves:
+        flat.append(tick)
+        flat.append(direction)
+    return flat
+
+def test_workers_replay_the_game():
+    for number, seed in enumerate(range(5)):
+        engine = SnakeEngine(15, .95)
+        engine.reset(seed)
+        game = (15, .95, seed, number)
+        while not engine.game_over:
+            replayed = mcts._replay(game, flatten(engine.moves), engine.ticks)
+            assert list(replayed.snake) == list(engine.snake)
+            assert (replayed.food, replayed.direction, replayed.score, replayed.speed) == \
+                (engine.food, engine.direction, engine.score, engine.speed)
+            d = greedy_controller(engine)
+            if d:
+                engine.turn(d)
+            engine.step()
+
+def test_player_searches_the_current_game():
+    player = MCTSPlayer(processes=1)
+    try:
+        engine = SnakeEngine(11)
+        for seed in range(2):
+            engine.reset(seed)
+            for _ in range(5):
+                player.start(engine, .05)
+                time.sleep(.1)
+                d = player.poll()
+                assert d in engine.safe_moves()
+                engine.turn(d)
+                engine.step()
+    finally:
+        player.close()
@@ -0,0 +1,49 @@
+from random import Random
+
+from engine import SnakeEngine
+from replay import write_game, read_games, replay
+from controllers import greedy_controller
+
+def play(seed):
+    rng = Random(seed)
+    engine = SnakeEngine(15, .95)
+    engine.reset(seed)
+    while not engine.game_over:
+        moves = engine.safe_moves()
+        if moves and rng.random() < .3:
+            engine.turn(moves[int(rng.random() * len(moves))])
+        engine.step()
+    return engine
+
+def test_replay_round_trip(tmpdir):
+    path = str(tmpdir.join('games.replay'))
+    games = [play(seed) for seed in range(10)]
+    for engine in games:
+        write_game(path, engine, player='random')
+    records = list(read_games(path))
+    assert len(records) == len(games)
+    for engine, record in zip(games, records):
+        assert record['player'] == 'random'
+        replayed = replay(record)
+        assert (replayed.score, replayed.food_eaten, replayed.ticks) == \
+            (engine.score, engine.food_eaten, engine.ticks)
+        assert list(replayed.snake) == list(engine.snake)
+        assert replayed.food == engine.food
+        assert replayed.moves == engine.moves
+
+def test_replay_unfinished_game(tmpdir):
+    path = str(tmpdir.join('games.replay'))
+    engine = SnakeEngine(15, .95)
+    engine.reset(3)
+    for _ in range(40):
+        d = greedy_controller(engine)
+        if d:
+            engine.turn(d)
+        engine.step()
+    assert not engine.game_over
+    write_game(path, engine, finished=False)
+    replayed = replay(next(read_games(path)))
+    assert not replayed.game_over
+    assert replayed.ticks == engine.ticks
+    assert list(replayed.snake) == list(engine.snake)
+    assert replayed.food == engine.food
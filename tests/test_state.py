@@ -0,0 +1,86 @@
+from random import Random
+
+from engine import SnakeEngine
+from state import SnakeState
+from controllers import greedy_controller
+
+def random_move(rng, moves):
+    return moves[int(rng.random() * len(moves))] if moves else 0
+
+def turn(engine, direction):
+    if direction:
+        engine.turn(direction)
+
+def assert_same(state, engine):
+    assert state.food == (engine.index(*engine.food) if engine.food else -1)
+    assert [divmod(i, engine.ncells) for i in state.cells()] == \
+        [(r - 1, c - 1) for c, r in engine.snake]
+    assert list(state.free_cells()) == list(engine.free)
+    assert (state.direction, state.score, state.food_eaten, state.ticks, state.game_over) == \
+        (engine.direction, engine.score, engine.food_eaten, engine.ticks, engine.game_over)
+
+def test_state_steps_like_engine():
+    for seed in range(20):
+        rng = Random(seed)
+        engine = SnakeEngine(11)
+        engine.reset(seed)
+        state = SnakeState.from_engine(engine)
+        while not engine.game_over:
+            d = random_move(rng, engine.safe_moves()) if rng.random() < .9 else rng.randint(1, 4)
+            if d:
+                engine.turn(d)
+            assert state.step(d) == engine.step()
+            assert_same(state, engine)
+
+def test_restore_continues_like_original():
+    for seed in range(20):
+        original = SnakeEngine(15)
+        original.reset(seed)
+        for _ in range(30):
+            turn(original, greedy_controller(original))
+            original.step()
+        if original.game_over:
+            continue
+        restored = SnakeState.from_engine(original).restore(SnakeEngine(15))
+        while not original.game_over:
+            d = greedy_controller(original)
+            turn(original, d)
+            turn(restored, d)
+            assert original.step() == restored.step()
+            assert restored.food == original.food
+            assert list(restored.snake) == list(original.snake)
+            assert restored.grid == original.grid
+            assert list(restored.free) == list(original.free)
+
+def test_copies_and_serialized_states_play_the_same():
+    engine = SnakeEngine(15)
+    engine.reset(7)
+    for _ in range(20):
+        turn(engine, greedy_controller(engine))
+        engine.step()
+    state = SnakeState.from_engine(engine)
+    copies = [state.copy(), SnakeState.loads(state.dumps()), state]
+    rng = Random(7)
+    while not state.game_over:
+        d = random_move(rng, state.safe_moves())
+        results = set(s.step(d) for s in copies)
+        assert len(results) == 1
+        assert len(set(s.key() for s in copies)) == 1
+        assert copies[0].cells() == copies[1].cells() == copies[2].cells()
+
+def test_long_games_compact_and_grow(monkeypatch):
+    # fold the moved free cells often and grow the ring past its first size
+    monkeypatch.setattr(SnakeState, 'COMPACT', 8)
+    for seed in range(5):
+        engine = SnakeEngine(13)
+        engine.reset(seed)
+        state = SnakeState.from_engine(engine)
+        copy = state.copy()
+        while not engine.game_over:
+            d = greedy_controller(engine)
+            turn(engine, d)
+            assert state.step(d) == engine.step() == copy.step(d)
+            assert_same(state, engine)
+            assert copy.cells() == state.cells()
+        assert engine.food_eaten > 16
+
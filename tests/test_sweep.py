@@ -0,0 +1,16 @@
+from sweep import parse_args, cache_key, run_condition
+
+def test_default_reference_agent_finishes_games():
+    args = parse_args([])
+    for board_size in (11, 31):
+        scores = []
+        for speed_factor in (.75, .9, 1.):
+            key = cache_key(args.controller, args.reaction, args.motor, 3, args.seed,
+                            args.max_ticks, board_size, speed_factor)
+            entry = run_condition((key, args.controller, args.reaction, args.motor, 3,
+                                   args.seed, args.max_ticks, board_size, speed_factor))
+            assert entry['timeouts'] == 0
+            assert entry['food_eaten'] > 1
+            scores.append(entry['score'])
+        # games that speed up faster are harder
+        assert scores == sorted(scores)
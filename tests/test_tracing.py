@@ -0,0 +1,24 @@
+import threading
+
+from tracing import Tracer
+
+def test_events_from_two_threads_stay_whole():
+    tracer = Tracer(size=1 << 12)
+    def spans():
+        for k in range(5000):
+            tracer.record('span', float(k), k + 1.)
+    def instants():
+        for k in range(5000):
+            tracer.record('instant', float(k), -1.)
+    threads = [threading.Thread(target=f) for f in (spans, instants, spans, instants)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert tracer.count == 20000
+    events = [e for e in tracer.events() if e['ph'] != 'M']
+    assert len(events) == tracer.size
+    for e in events:
+        assert (e['name'] == 'span') == (e['ph'] == 'X')
+        if e['ph'] == 'X':
+            assert abs(e['dur'] - 1e6) < 1e-3